@@ -0,0 +1,34 @@
+"""add_music_tracks_category_duration_index
+
+Revision ID: 8b3e41c7d2a9
+Revises: cae2ad28fd17
+Create Date: 2026-10-17 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3e41c7d2a9'
+down_revision: Union[str, Sequence[str], None] = 'cae2ad28fd17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Composite index for music selection (category match + minimum duration)
+    op.create_index(
+        'ix_music_tracks_category_duration',
+        'music_tracks',
+        ['category', 'duration'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_music_tracks_category_duration', table_name='music_tracks')
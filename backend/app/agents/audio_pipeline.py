@@ -11,17 +11,24 @@ import os
 import time
 import tempfile
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI
 from sqlalchemy.orm import Session
 from .base import AgentInput, AgentOutput
 from .music_agent import MusicSelectionAgent, MusicProcessingService
 from app.config import get_settings
+from app.services.http_client import get_openai_http_client
+from app.services.progress_items import CumulativeItems
 
 logger = logging.getLogger(__name__)
 
 
+async def _noop_async(*args, **kwargs) -> None:
+    """Stand-in for status updates when no WebSocket progress is being reported."""
+    return None
+
+
 class AudioPipelineAgent:
     """
     Audio Pipeline Agent that generates TTS audio using OpenAI.
@@ -71,6 +78,16 @@ class AudioPipelineAgent:
         "shimmer": "Warm, friendly"
     }
 
+    # Voice listing served by get_available_voices(), built once at import
+    VOICE_LIST = [
+        {
+            "voice_id": voice_id,
+            "name": voice_id.capitalize(),
+            "description": description
+        }
+        for voice_id, description in AVAILABLE_VOICES.items()
+    ]
+
     def __init__(
         self,
         api_key: Optional[str] = None,
@@ -130,7 +147,7 @@ class AudioPipelineAgent:
                 "Add it to AWS Secrets Manager (pipeline/openai-api-key) or .env file."
             )
         else:
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = AsyncOpenAI(api_key=self.api_key, http_client=get_openai_http_client())
 
         # Initialize music agents if db and storage are provided
         if self.db:
@@ -141,85 +158,56 @@ class AudioPipelineAgent:
     async def _update_cumulative_status(
         self,
         session_id: str,
-        cumulative_items: list,
+        cumulative_items: CumulativeItems,
         item_id: str,
         new_status: str
     ):
         """Update a single audio item's status and broadcast the full cumulative state."""
-        if not cumulative_items or not self.websocket_manager:
-            return
-
-        # Find and update the item
-        for item in cumulative_items:
-            if item["id"] == item_id:
-                item["status"] = new_status
-                break
-
-        # Count completed items for progress calculation
-        completed_count = sum(1 for item in cumulative_items if item["status"] == "completed")
-        total_count = len(cumulative_items)
-        progress = int((completed_count / total_count) * 100) if total_count > 0 else 0
-
-        # Generate details message
-        processing_items = [item for item in cumulative_items if item["status"] == "processing"]
-        if processing_items:
-            details = f"Processing: {processing_items[0]['name']}"
-        else:
-            details = f"Completed {completed_count} of {total_count} items"
+        cumulative_items.set_status(item_id, new_status)
 
         # Broadcast the full cumulative state
         await self.websocket_manager.broadcast_status(
             session_id,
             status="generating_images_audio",
-            progress=progress,
-            details=details,
+            progress=cumulative_items.progress,
+            details=cumulative_items.details,
             items=cumulative_items
         )
 
     async def _generate_single_audio(
         self,
         part_name: str,
-        part_data: Dict[str, Any],
+        text: str,
         voice: str,
         session_id: str,
         cumulative_items: list,
         part_idx: int,
-        total_parts: int
+        total_parts: int,
+        ws_active: bool = False,
+        update_status: Callable[..., Awaitable[None]] = _noop_async
     ) -> Dict[str, Any]:
-        """Generate audio for a single script part."""
-        try:
-            text = part_data.get("text", "")
-
-            if not text:
-                logger.warning(f"[{session_id}] Part '{part_name}' has no text, skipping audio generation")
-                return {
-                    "success": False,
-                    "error": f"Part '{part_name}' has no text"
-                }
+        """
+        Generate audio for a single script part (text is pre-validated as non-empty).
 
+        ws_active and update_status are resolved once per run by process():
+        whether cumulative WebSocket updates are live, and the status updater
+        to call (a no-op when they are not).
+        """
+        try:
             # Update cumulative status: mark audio as processing
             item_id = f"audio_{part_name}"
-            if cumulative_items:
-                await self._update_cumulative_status(
-                    session_id,
-                    cumulative_items,
-                    item_id,
-                    "processing"
-                )
+            await update_status(
+                session_id,
+                cumulative_items,
+                item_id,
+                "processing"
+            )
 
             logger.info(
                 f"[{session_id}] Generating audio for '{part_name}' "
                 f"({len(text)} chars, voice: {voice})"
             )
 
-            # Generate TTS audio using OpenAI
-            response = self.client.audio.speech.create(
-                model="tts-1",  # Use tts-1 (faster, cheaper) or tts-1-hd (higher quality)
-                voice=voice,
-                input=text,
-                response_format="mp3"
-            )
-
             # Save to temporary file (cross-platform)
             temp_dir = tempfile.gettempdir()
             os.makedirs(temp_dir, exist_ok=True)
@@ -227,9 +215,15 @@ class AudioPipelineAgent:
             filename = f"audio_{part_name}_{session_id}.mp3"
             filepath = os.path.join(temp_dir, filename)
 
-            # Write audio bytes to file
-            with open(filepath, "wb") as f:
-                f.write(response.content)
+            # Generate TTS audio using OpenAI, streaming the MP3 body straight
+            # to disk so the full audio is never buffered in memory
+            async with self.client.audio.speech.with_streaming_response.create(
+                model="tts-1",  # Use tts-1 (faster, cheaper) or tts-1-hd (higher quality)
+                voice=voice,
+                input=text,
+                response_format="mp3"
+            ) as response:
+                await response.stream_to_file(filepath)
 
             logger.debug(f"[{session_id}] Saved audio file to: {filepath}")
 
@@ -245,16 +239,15 @@ class AudioPipelineAgent:
             estimated_duration = (words / 150) * 60  # seconds
 
             # Update cumulative status: mark audio as completed
-            if cumulative_items:
-                await self._update_cumulative_status(
-                    session_id,
-                    cumulative_items,
-                    item_id,
-                    "completed"
-                )
+            await update_status(
+                session_id,
+                cumulative_items,
+                item_id,
+                "completed"
+            )
 
             # Send WebSocket update for each audio file generated (backward compatibility)
-            if self.websocket_manager and not cumulative_items:
+            if self.websocket_manager and not ws_active:
                 await self.websocket_manager.broadcast_status(
                     session_id,
                     status="audio_generated",
@@ -315,6 +308,14 @@ class AudioPipelineAgent:
             voice = input.data.get("voice", self.DEFAULT_VOICE)
             audio_option = input.data.get("audio_option", "tts")
             cumulative_items = input.data.get("cumulative_items", [])
+            if cumulative_items and not isinstance(cumulative_items, CumulativeItems):
+                cumulative_items = CumulativeItems(cumulative_items)
+            # Decided per run (the agent is shared across sessions): with no
+            # live cumulative updates, status changes go to a no-op
+            ws_active = bool(cumulative_items and self.websocket_manager)
+            update_status = (
+                self._update_cumulative_status if ws_active else _noop_async
+            )
 
             # Handle non-TTS options
             if audio_option != "tts":
@@ -324,8 +325,22 @@ class AudioPipelineAgent:
             if not script:
                 raise ValueError("Script is required in input.data")
 
+            # Single pass: check required parts and collect the ones with text,
+            # so empty parts never get a coroutine scheduled
             required_parts = ["hook", "concept", "process", "conclusion"]
-            missing_parts = [p for p in required_parts if p not in script]
+            missing_parts = []
+            parts_to_run = []
+            for idx, part_name in enumerate(required_parts):
+                if part_name not in script:
+                    missing_parts.append(part_name)
+                    continue
+                text = (script[part_name] or {}).get("text") or ""
+                if text:
+                    parts_to_run.append((idx, part_name, text))
+                else:
+                    logger.warning(
+                        f"[{input.session_id}] Part '{part_name}' has no text, skipping audio generation"
+                    )
             if missing_parts:
                 raise ValueError(
                     f"Script missing required parts: {', '.join(missing_parts)}"
@@ -341,21 +356,23 @@ class AudioPipelineAgent:
             # Generate audio for all parts in parallel
             audio_files = []
             total_cost = 0.0
+            total_duration = 0.0
             total_parts = len(required_parts)
 
             # Create tasks for all audio parts
             audio_tasks = [
                 self._generate_single_audio(
                     part_name=part_name,
-                    part_data=script[part_name],
+                    text=text,
                     voice=voice,
                     session_id=input.session_id,
                     cumulative_items=cumulative_items,
                     part_idx=idx + 1,
-                    total_parts=total_parts
+                    total_parts=total_parts,
+                    ws_active=ws_active,
+                    update_status=update_status
                 )
-                for idx, part_name in enumerate(required_parts)
-                if script[part_name].get("text", "")  # Only generate if text exists
+                for idx, part_name, text in parts_to_run
             ]
 
             # Generate all audio files in parallel
@@ -369,6 +386,7 @@ class AudioPipelineAgent:
                 elif isinstance(result, dict) and result.get("success"):
                     audio_files.append(result["audio_data"])
                     total_cost += result.get("cost", 0.0)
+                    total_duration += result["audio_data"]["duration"]
                 else:
                     logger.warning(f"[{input.session_id}] Audio generation failed: {result.get('error', 'Unknown error')}")
 
@@ -379,7 +397,7 @@ class AudioPipelineAgent:
                     logger.info(f"[{input.session_id}] Generating background music...")
                     music_file = await self._generate_background_music(
                         script=script,
-                        total_duration=sum(af["duration"] for af in audio_files),
+                        total_duration=total_duration,
                         session_id=input.session_id,
                         user_id=input.data.get("user_id")
                     )
@@ -396,7 +414,6 @@ class AudioPipelineAgent:
                     )
 
             duration = time.time() - start_time
-            total_duration = sum(af["duration"] for af in audio_files if af["part"] != "music")
 
             logger.info(
                 f"[{input.session_id}] Audio generation complete: "
@@ -509,12 +526,6 @@ class AudioPipelineAgent:
 
         Returns:
             List of voice objects with id, name, and description
+            (shared; callers must not mutate it)
         """
-        return [
-            {
-                "voice_id": voice_id,
-                "name": voice_id.capitalize(),
-                "description": description
-            }
-            for voice_id, description in self.AVAILABLE_VOICES.items()
-        ]
+        return self.VOICE_LIST
@@ -8,9 +8,12 @@ Purpose: Generate multiple images for video scripts using:
 Each script part (hook, concept, process, conclusion) gets 2-3 images.
 """
 
+import os
+import re
 import time
 import asyncio
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, Dict, List, Any
 from io import BytesIO
 
@@ -19,9 +22,46 @@ from app.agents.helpers.template_matcher import TemplateMatcher
 from app.agents.helpers.psd_customizer import PSDCustomizer
 from app.agents.helpers.dalle_generator import DALLEGenerator
 from app.services.storage import StorageService
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Semantic progression keywords: establishing -> medium -> close-up
+PROGRESSION_KEYWORDS = (
+    "establishing shot, wide angle, context view, cinematic framing",
+    "medium shot, focused composition, key details visible",
+    "close-up detail, emphasis on subject, intimate view",
+)
+SINGLE_IMAGE_KEYWORDS = "balanced composition, clear view"
+
+# A run of non-terminators followed by its terminator(s) (. ! ?) or end of text
+SENTENCE_RE = re.compile(r'[^.!?]+(?:[.!?]+|$)')
+
+# Process pool for template compositing, shared by every agent instance.
+# Created on first use and shut down once at app shutdown.
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    Return the process-wide template render pool.
+
+    Template compositing is CPU-bound PIL work; worker processes let several
+    customizations use separate cores instead of sharing the GIL.
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    """Stop the render pool's worker processes (called at app shutdown)."""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
 
 class BatchImageGeneratorAgent:
     """
@@ -31,6 +71,12 @@ class BatchImageGeneratorAgent:
     - Tries to match templates first based on key concepts
     - Falls back to DALL-E 3 for images without template matches
     - Targets 60% template usage to minimize costs
+
+    Holds HTTP clients; release them with ``await aclose()``
+    or use the agent as an async context manager:
+
+        async with BatchImageGeneratorAgent(api_key) as agent:
+            result = await agent.process(agent_input)
     """
 
     def __init__(self, openai_api_key: str = None):
@@ -41,10 +87,14 @@ class BatchImageGeneratorAgent:
             openai_api_key: OpenAI API key for DALL-E 3
         """
         self.template_matcher = TemplateMatcher()
-        self.psd_customizer = PSDCustomizer()
+        self.psd_customizer = PSDCustomizer(executor=get_render_pool())
         self.dalle_generator = DALLEGenerator(api_key=openai_api_key)
         self.storage_service = StorageService()
 
+        # Cap in-flight generations so long scripts don't fire every DALL-E
+        # call and template download at once (avoids 429 retry storms)
+        self._semaphore = asyncio.Semaphore(max(1, get_settings().IMG_MAX_CONCURRENCY))
+
     async def process(self, input: AgentInput) -> AgentOutput:
         """
         Generate images for each part of a video script.
@@ -81,45 +131,69 @@ class BatchImageGeneratorAgent:
             # If per-part config provided, use it; otherwise use uniform count
             if images_per_part_config:
                 logger.info(
-                    f"[{input.session_id}] Generating images with duration-based scaling: {images_per_part_config}"
+                    "[%s] Generating images with duration-based scaling: %s",
+                    input.session_id, images_per_part_config
                 )
             else:
                 logger.info(
-                    f"[{input.session_id}] Generating {images_per_part} images per script part "
-                    f"(prefer_templates={prefer_templates})"
+                    "[%s] Generating %d images per script part (prefer_templates=%s)",
+                    input.session_id, images_per_part, prefer_templates
                 )
 
-            # Generate images for each script part in parallel
+            # Pick a template or a DALL-E prompt for every image up front
+            # (matching is cheap and synchronous), so the DALL-E batch can
+            # start right away instead of waiting on template renders.
+            # plan holds (part_name, image_index) per result slot.
             script_parts = ["hook", "concept", "process", "conclusion"]
-            all_tasks = []
-            task_metadata = []  # Track which task belongs to which part
-
+            template_matches = {}  # Memoized template matches for this run
+            plan = []
+            requests = []
             for part_name in script_parts:
-                script_part = script[part_name]
-
-                # Get images count for this part
-                part_images_count = images_per_part_config.get(part_name, images_per_part) if images_per_part_config else images_per_part
-
-                for i in range(part_images_count):
-                    # For 60% templates: use template for first 60% of images
-                    # Strategy: template for image 0, DALL-E for image 1 (if 2 images/part)
-                    # Or: template, template, DALL-E for 3 images
-                    use_template = prefer_templates and (i < int(part_images_count * 0.6) or i == 0)
-
-                    task = self._generate_image_for_script_part(
-                        session_id=input.session_id,
-                        script_part=script_part,
-                        part_name=part_name,
-                        image_index=i,
-                        prefer_template=use_template,
-                        total_images=part_images_count,
-                        use_semantic_progression=use_semantic_progression
-                    )
-                    all_tasks.append(task)
-                    task_metadata.append({"part_name": part_name, "index": i})
-
-            # Execute all tasks concurrently
-            results = await asyncio.gather(*all_tasks, return_exceptions=True)
+                image_count = (
+                    images_per_part_config.get(part_name, images_per_part)
+                    if images_per_part_config else images_per_part
+                )
+                for i in range(image_count):
+                    plan.append((part_name, i))
+                    try:
+                        requests.append(self._plan_image(
+                            session_id=input.session_id,
+                            script_part=script[part_name],
+                            part_name=part_name,
+                            image_index=i,
+                            # For 60% templates: template for the first 60% of
+                            # images (always image 0), DALL-E for the rest
+                            prefer_template=prefer_templates and (i < int(image_count * 0.6) or i == 0),
+                            total_images=image_count,
+                            use_semantic_progression=use_semantic_progression,
+                            template_matches=template_matches
+                        ))
+                    except Exception as e:
+                        requests.append(e)
+
+            # One TaskGroup runs the DALL-E batch alongside the template
+            # renders and uploads. Per-image failures come back as Exception
+            # results, so only unexpected errors cancel the group.
+            results: List[Any] = list(requests)
+            dalle_slots = [
+                i for i, request in enumerate(requests)
+                if isinstance(request, dict) and request["template_match"] is None
+            ]
+            async with asyncio.TaskGroup() as tg:
+                dalle_task = tg.create_task(self._run_dalle(
+                    input.session_id,
+                    [requests[i] for i in dalle_slots]
+                ))
+                template_tasks = {
+                    i: tg.create_task(self._render_template(input.session_id, request))
+                    for i, request in enumerate(requests)
+                    if isinstance(request, dict) and request["template_match"] is not None
+                }
+
+            for i, result in zip(dalle_slots, dalle_task.result()):
+                results[i] = result
+            for i, task in template_tasks.items():
+                results[i] = task.result()
 
             # Organize results by script part
             micro_scenes = {
@@ -134,12 +208,10 @@ class BatchImageGeneratorAgent:
             templates_used = 0
             dalle_used = 0
 
-            for i, result in enumerate(results):
-                part_name = task_metadata[i]["part_name"]
-
+            for (part_name, image_index), result in zip(plan, results):
                 if isinstance(result, Exception):
-                    error_msg = f"{part_name} image {task_metadata[i]['index']} failed: {result}"
-                    logger.error(f"[{input.session_id}] {error_msg}")
+                    error_msg = f"{part_name} image {image_index} failed: {result}"
+                    logger.error("[%s] %s", input.session_id, error_msg)
                     errors.append(error_msg)
                     continue
 
@@ -165,15 +237,13 @@ class BatchImageGeneratorAgent:
             if success:
                 template_pct = (templates_used / total_images * 100) if total_images > 0 else 0
                 logger.info(
-                    f"[{input.session_id}] Generated {total_images} total images "
-                    f"({templates_used} templates, {dalle_used} DALL-E) "
-                    f"in {duration:.2f}s (${total_cost:.2f})"
+                    "[%s] Generated %d total images (%d templates, %d DALL-E) in %.2fs ($%.2f)",
+                    input.session_id, total_images, templates_used, dalle_used,
+                    duration, total_cost
                 )
-                logger.info(f"[{input.session_id}] Template usage: {template_pct:.1f}%")
+                logger.info("[%s] Template usage: %.1f%%", input.session_id, template_pct)
             else:
-                logger.error(
-                    f"[{input.session_id}] All image generations failed"
-                )
+                logger.error("[%s] All image generations failed", input.session_id)
 
             return AgentOutput(
                 success=success,
@@ -195,7 +265,7 @@ class BatchImageGeneratorAgent:
 
         except Exception as e:
             duration = time.time() - start_time
-            logger.error(f"[{input.session_id}] Batch image generation failed: {e}")
+            logger.error("[%s] Batch image generation failed: %s", input.session_id, e)
 
             return AgentOutput(
                 success=False,
@@ -222,20 +292,12 @@ class BatchImageGeneratorAgent:
             Comma-separated keywords for visual progression
         """
         if total_images == 1:
-            return "balanced composition, clear view"
+            return SINGLE_IMAGE_KEYWORDS
 
-        # Calculate progression (0.0 = start, 1.0 = end)
+        # Calculate progression (0.0 = start, 1.0 = end) and bucket it:
+        # < 0.33 establishing, < 0.67 medium, otherwise close-up
         progression = image_index / (total_images - 1)
-
-        if progression < 0.33:
-            # Early images: Establish context
-            return "establishing shot, wide angle, context view, cinematic framing"
-        elif progression < 0.67:
-            # Middle images: Focus on details
-            return "medium shot, focused composition, key details visible"
-        else:
-            # Late images: Close-up, emphasis
-            return "close-up detail, emphasis on subject, intimate view"
+        return PROGRESSION_KEYWORDS[(progression >= 0.33) + (progression >= 0.67)]
 
     def _split_narration_for_images(self, text: str, image_index: int, total_images: int) -> str:
         """
@@ -256,11 +318,12 @@ class BatchImageGeneratorAgent:
         Returns:
             Portion of narration text for this image
         """
-        if not text or total_images == 1:
+        # Only images 0 and 1 use a split; skip sentence splitting otherwise
+        if not text or total_images == 1 or image_index >= 2:
             return text
 
-        # Split by sentences
-        sentences = [s.strip() + '.' for s in text.split('.') if s.strip()]
+        # Split by sentences, keeping each sentence's own terminal punctuation
+        sentences = [s for s in (m.strip() for m in SENTENCE_RE.findall(text)) if s]
         num_sentences = len(sentences)
 
         if num_sentences <= 1:
@@ -271,19 +334,25 @@ class BatchImageGeneratorAgent:
             # First image: Use first half of sentences (early concepts)
             split_point = max(1, num_sentences // 2)
             result = ' '.join(sentences[:split_point])
-            logger.debug(f"Image {image_index}: Early concepts (first {split_point}/{num_sentences} sentences)")
+            logger.debug(
+                "Image %d: Early concepts (first %d/%d sentences)",
+                image_index, split_point, num_sentences
+            )
             return result
         elif image_index == 1 and total_images >= 2:
             # Second image: Use second half of sentences (late concepts)
             split_point = num_sentences // 2
             result = ' '.join(sentences[split_point:])
-            logger.debug(f"Image {image_index}: Late concepts (last {num_sentences - split_point}/{num_sentences} sentences)")
+            logger.debug(
+                "Image %d: Late concepts (last %d/%d sentences)",
+                image_index, num_sentences - split_point, num_sentences
+            )
             return result
         else:
             # Third+ image or fallback: Use full text
             return text
 
-    async def _generate_image_for_script_part(
+    def _plan_image(
         self,
         session_id: str,
         script_part: Dict[str, Any],
@@ -291,11 +360,15 @@ class BatchImageGeneratorAgent:
         image_index: int,
         prefer_template: bool = True,
         total_images: int = 2,
-        use_semantic_progression: bool = False
+        use_semantic_progression: bool = False,
+        template_matches: Optional[Dict[tuple, Optional[Dict[str, Any]]]] = None
     ) -> dict:
         """
-        Generate a single image for a script part.
-        Tries template first (if prefer_template), then DALL-E 3 as fallback.
+        Decide how a single image for a script part will be made.
+        Matches a template first (if prefer_template); the DALL-E 3 prompt is
+        always built, as the fallback if the template render fails. No I/O
+        happens here: process() renders templates and issues the DALL-E
+        requests together.
 
         Args:
             session_id: Session ID for logging
@@ -304,12 +377,16 @@ class BatchImageGeneratorAgent:
             image_index: Image index for this part (0-2)
             prefer_template: Try template before DALL-E
             total_images: Total number of images for this part
+            template_matches: Optional per-run memo of template matches keyed by
+                (visual_guidance, tuple(key_concepts)); images of the same part
+                share it so the matcher runs once per distinct input
 
         Returns:
-            Dict with URL and metadata
+            Image request ({template_match, dalle_prompt, start, metadata});
+            template_match is None when the image goes to DALL-E
 
         Raises:
-            Exception: If both template and DALL-E generation fail
+            Exception: If the image could not be prepared
         """
         start = time.time()
 
@@ -326,8 +403,9 @@ class BatchImageGeneratorAgent:
             # This ensures each image shows what's being said when it appears on screen
             if focused_text != narration_text:
                 logger.info(
-                    f"[{session_id}] {part_name} image {image_index + 1}: "
-                    f"{'Early' if image_index == 0 else 'Late'} concepts - '{focused_text[:60]}...'"
+                    "[%s] %s image %d: %s concepts - '%.60s...'",
+                    session_id, part_name, image_index + 1,
+                    'Early' if image_index == 0 else 'Late', focused_text
                 )
                 focused_guidance = focused_text
             else:
@@ -335,111 +413,213 @@ class BatchImageGeneratorAgent:
                 focused_guidance = visual_guidance
 
             # Try template first if preferred
+            template_match = None
             if prefer_template:
-                template_match = self.template_matcher.match_template(
+                template_match = self._match_template(
                     visual_guidance,
-                    key_concepts
+                    key_concepts,
+                    template_matches
                 )
 
-                if template_match:
-                    logger.info(
-                        f"[{session_id}] Using template '{template_match['name']}' "
-                        f"for {part_name} image {image_index + 1}"
-                    )
-
-                    # Customize template with text overlays
-                    customizations = {
-                        "title": key_concepts[0] if key_concepts else "",
-                        "labels": key_concepts[:3]
-                    }
-
-                    try:
-                        customized_image_bytes = self.psd_customizer.customize_template(
-                            template_match['preview_url'],
-                            customizations
-                        )
-
-                        # Upload customized template to S3
-                        # (For now, return a placeholder - storage integration needed)
-                        url = template_match['preview_url']  # TODO: Upload customized version
-
-                        duration = time.time() - start
-
-                        return {
-                            "url": url,
-                            "cost": 0.0,  # Templates are free
-                            "metadata": {
-                                "part_name": part_name,
-                                "image_index": image_index,
-                                "duration": duration,
-                                "source": "template",
-                                "template_id": template_match['template_id'],
-                                "template_name": template_match['name'],
-                                "key_concepts": key_concepts,
-                                "visual_guidance": visual_guidance[:200]
-                            }
-                        }
-                    except Exception as e:
-                        logger.warning(
-                            f"[{session_id}] Template customization failed: {e}, "
-                            f"falling back to DALL-E"
-                        )
-                        # Fall through to DALL-E
-
-            # Generate with DALL-E 3
+            # DALL-E 3 prompt, used directly or as the template fallback
             # Add semantic progression keywords if enabled
             if use_semantic_progression and total_images > 1:
                 progression_keywords = self._get_progression_keywords(image_index, total_images)
                 enhanced_guidance = f"{focused_guidance}, {progression_keywords}"
+            else:
+                progression_keywords = None
+                enhanced_guidance = focused_guidance
+
+            if template_match:
+                logger.info(
+                    "[%s] Using template '%s' for %s image %d",
+                    session_id, template_match['name'], part_name, image_index + 1
+                )
+            elif progression_keywords:
                 logger.info(
-                    f"[{session_id}] Generating {part_name} image {image_index + 1}/{total_images} "
-                    f"with DALL-E 3 ({progression_keywords})"
+                    "[%s] Generating %s image %d/%d with DALL-E 3 (%s)",
+                    session_id, part_name, image_index + 1, total_images, progression_keywords
                 )
             else:
-                enhanced_guidance = focused_guidance
                 logger.info(
-                    f"[{session_id}] Generating {part_name} image {image_index + 1} "
-                    f"with DALL-E 3"
+                    "[%s] Generating %s image %d with DALL-E 3",
+                    session_id, part_name, image_index + 1
                 )
 
-            result = await self.dalle_generator.generate_image(
-                enhanced_guidance,  # Use enhanced guidance with progression
-                style="educational"
-            )
-
-            if not result['success']:
-                raise Exception(result.get('error', 'DALL-E generation failed'))
-
-            duration = time.time() - start
-
             return {
-                "url": result['url'],
-                "cost": result['cost'],
+                "template_match": template_match,
+                "dalle_prompt": enhanced_guidance,  # Enhanced guidance with progression
+                "start": start,
                 "metadata": {
                     "part_name": part_name,
                     "image_index": image_index,
-                    "duration": duration,
                     "source": "dalle3",
-                    "quality": result.get('quality', 'standard'),
                     "key_concepts": key_concepts,
-                    "visual_guidance": visual_guidance[:200],
-                    "prompt_used": result.get('prompt_used', '')[:200]
+                    "visual_guidance": visual_guidance[:200]
                 }
             }
 
         except Exception as e:
             duration = time.time() - start
             logger.error(
-                f"[{session_id}] {part_name} image {image_index + 1} generation failed "
-                f"after {duration:.2f}s: {e}"
+                "[%s] %s image %d generation failed after %.2fs: %s",
+                session_id, part_name, image_index + 1, duration, e
             )
             raise
 
-    def close(self):
-        """Cleanup resources."""
-        if hasattr(self, 'template_matcher'):
-            self.template_matcher.close()
+    async def _render_template(self, session_id: str, request: dict) -> Any:
+        """
+        Customize and upload a matched template under the agent's concurrency cap.
+
+        Falls back to DALL-E 3 for this image if customization fails. Returns
+        the finished image dict, or an Exception if both paths failed.
+        """
+        template_match = request["template_match"]
+        metadata = request["metadata"]
+        key_concepts = metadata["key_concepts"]
+
+        try:
+            async with self._semaphore:
+                # Customize template with text overlays
+                customizations = {
+                    "title": key_concepts[0] if key_concepts else "",
+                    "labels": key_concepts[:3]
+                }
+                customized_image_bytes = await self.psd_customizer.customize_template(
+                    template_match['preview_url'],
+                    customizations
+                )
+
+                # Upload customized template to S3 (off the event loop, so
+                # it overlaps with DALL-E calls already in flight)
+                url = await self._upload_customized_template(
+                    session_id,
+                    metadata["part_name"],
+                    metadata["image_index"],
+                    customized_image_bytes,
+                    fallback_url=template_match['preview_url']
+                )
+        except Exception as e:
+            logger.warning(
+                "[%s] Template customization failed: %s, falling back to DALL-E",
+                session_id, e
+            )
+            return (await self._run_dalle(session_id, [request]))[0]
+
+        return {
+            "url": url,
+            "cost": 0.0,  # Templates are free
+            "metadata": {
+                **metadata,
+                "duration": time.time() - request["start"],
+                "source": "template",
+                "template_id": template_match['template_id'],
+                "template_name": template_match['name'],
+            }
+        }
+
+    def _match_template(
+        self,
+        visual_guidance: str,
+        key_concepts: List[str],
+        template_matches: Optional[Dict[tuple, Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """Match a template, reusing an earlier result for identical inputs."""
+        if template_matches is None:
+            return self.template_matcher.match_template(visual_guidance, key_concepts)
+
+        key = (visual_guidance, tuple(key_concepts))
+        if key not in template_matches:
+            template_matches[key] = self.template_matcher.match_template(
+                visual_guidance,
+                key_concepts
+            )
+        return template_matches[key]
+
+    async def _upload_customized_template(
+        self,
+        session_id: str,
+        part_name: str,
+        image_index: int,
+        image_bytes: bytes,
+        fallback_url: str
+    ) -> str:
+        """
+        Upload a customized template image and return its S3 URL.
+
+        Falls back to the uncustomized template preview if storage isn't
+        configured or the upload fails, rather than paying for DALL-E.
+        """
+        if not self.storage_service.s3_client:
+            return fallback_url
+
+        s3_key = (
+            f"templates/{session_id}/{part_name}_{image_index}"
+            f"{self.psd_customizer.file_extension}"
+        )
+        try:
+            return await self.storage_service.put_bytes_async(
+                s3_key,
+                image_bytes,
+                self.psd_customizer.content_type
+            )
+        except Exception as e:
+            logger.warning(
+                "[%s] Customized template upload failed: %s, using template preview",
+                session_id, e
+            )
+            return fallback_url
+
+    async def _run_dalle(self, session_id: str, requests: List[dict]) -> List[Any]:
+        """
+        Issue DALL-E requests in one batch.
+
+        Returns, in request order, the finished image dict for each request,
+        or an Exception if its generation failed.
+        """
+        if not requests:
+            return []
+
+        dalle_results = await self.dalle_generator.generate_images_batch(
+            [request["dalle_prompt"] for request in requests],
+            style="educational",
+            max_concurrency=get_settings().IMG_MAX_CONCURRENCY
+        )
+
+        results = []
+        for request, result in zip(requests, dalle_results):
+            metadata = dict(request["metadata"])
+            duration = time.time() - request["start"]
+
+            if not result['success']:
+                error = result.get('error', 'DALL-E generation failed')
+                logger.error(
+                    "[%s] %s image %d generation failed after %.2fs: %s",
+                    session_id, metadata['part_name'], metadata['image_index'] + 1,
+                    duration, error
+                )
+                results.append(Exception(error))
+                continue
+
+            metadata.update({
+                "duration": duration,
+                "quality": result.get('quality', 'standard'),
+                "prompt_used": result.get('prompt_used', '')[:200]
+            })
+            results.append({
+                "url": result['url'],
+                "cost": result['cost'],
+                "metadata": metadata
+            })
+        return results
+
+    async def aclose(self):
+        """Release the HTTP clients (the render pool is shared; see shutdown_render_pool)."""
+        await self.dalle_generator.aclose()
+        await self.psd_customizer.aclose()
+
+    async def __aenter__(self) -> "BatchImageGeneratorAgent":
+        return self
 
-    def __del__(self):
-        """Cleanup on deletion."""
-        self.close()
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
@@ -6,11 +6,77 @@ Generates educational images using OpenAI's DALL-E 3 model.
 from openai import AsyncOpenAI
 import os
 import time
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any
+from collections import OrderedDict
+from functools import cached_property
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.services.http_client import get_openai_http_client
 
 logger = logging.getLogger(__name__)
 
+IMAGE_SIZE = "1792x1024"  # Landscape for video (16:9 aspect ratio)
+MAX_PROMPT_CHARS = 3997  # DALL-E 3 prompt length limit (with headroom)
+
+# Style guidance appended to every prompt
+STYLE_GUIDES = {
+    "educational": (
+        "Educational diagram style, clean and clear, bright colors, "
+        "labeled components, appropriate for middle school students "
+        "(grades 6-7), scientific accuracy, professional quality, "
+        "no text in image"
+    ),
+    "realistic": (
+        "Photorealistic style, high detail, natural lighting, "
+        "scientific accuracy, professional photography quality"
+    ),
+    "illustration": (
+        "Hand-drawn illustration style, colorful, engaging for students, "
+        "clear visual hierarchy, educational diagram quality"
+    ),
+    "diagram": (
+        "Technical diagram style, clean lines, clear labels, "
+        "educational infographic quality, bright colors on white background"
+    )
+}
+
+# Process-wide result cache: {blake2b(prompt|quality|size): (url, expiry_timestamp)}
+# DALL-E result URLs expire after ~60 minutes, so entries must expire before that.
+_url_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+CACHE_MAX_ENTRIES = 512
+CACHE_TTL_SECONDS = 50 * 60
+
+
+def _cache_key(enhanced_prompt: str, quality: str) -> str:
+    """Content-addressed key for a DALL-E request."""
+    return hashlib.blake2b(
+        f"{enhanced_prompt}|{quality}|{IMAGE_SIZE}".encode("utf-8"),
+        digest_size=16
+    ).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[str]:
+    """Return a cached, unexpired image URL and mark it recently used."""
+    entry = _url_cache.get(key)
+    if entry is None:
+        return None
+    url, expiry = entry
+    if time.time() >= expiry:
+        del _url_cache[key]
+        return None
+    _url_cache.move_to_end(key)
+    return url
+
+
+def _cache_put(key: str, url: str) -> None:
+    """Store an image URL, evicting the least recently used entries."""
+    _url_cache[key] = (url, time.time() + CACHE_TTL_SECONDS)
+    _url_cache.move_to_end(key)
+    while len(_url_cache) > CACHE_MAX_ENTRIES:
+        _url_cache.popitem(last=False)
+
 
 class DALLEGenerator:
     """Generates images using DALL-E 3."""
@@ -19,56 +85,74 @@ class DALLEGenerator:
         """
         Initialize DALL-E generator.
 
+        The API key and OpenAI client are resolved lazily on the first DALL-E
+        call, so runs served entirely from templates (or the prompt cache)
+        never hit Secrets Manager or open a connection pool.
+
         Args:
             api_key: OpenAI API key (defaults to AWS Secrets Manager, then env var)
         """
+        self._api_key_override = api_key
+
+        # DALL-E 3 pricing (as of 2024)
+        self.costs = {
+            "standard": 0.040,  # $0.04 per image (1024x1024 or 1792x1024)
+            "hd": 0.080  # $0.08 per image HD quality
+        }
+
+    @cached_property
+    def api_key(self) -> Optional[str]:
+        """OpenAI API key, resolved on first access."""
         # Try to get API key from parameter, then .env (for local dev), then Secrets Manager
-        if api_key:
-            self.api_key = api_key
-        else:
+        api_key = self._api_key_override
+        if not api_key:
             from app.config import get_settings
             settings = get_settings()
             
             # For local development, prioritize .env file
             if settings.DEBUG:
                 # Local development: check .env first
-                self.api_key = settings.OPENAI_API_KEY
-                if self.api_key and self.api_key.strip():
+                api_key = settings.OPENAI_API_KEY
+                if api_key and api_key.strip():
                     logger.debug("Using OPENAI_API_KEY from .env file (local development) for DALL-E")
                 else:
                     # Fallback to AWS Secrets Manager if .env doesn't have it
                     try:
                         from app.services.secrets import get_secret
-                        self.api_key = get_secret("pipeline/openai-api-key")
-                        if self.api_key:
+                        api_key = get_secret("pipeline/openai-api-key")
+                        if api_key:
                             logger.debug("Using OPENAI_API_KEY from AWS Secrets Manager (fallback) for DALL-E")
                     except Exception as e:
-                        logger.debug(f"Could not retrieve OPENAI_API_KEY from Secrets Manager: {e}")
+                        logger.debug("Could not retrieve OPENAI_API_KEY from Secrets Manager: %s", e)
             else:
                 # Production: check AWS Secrets Manager first
                 try:
                     from app.services.secrets import get_secret
-                    self.api_key = get_secret("pipeline/openai-api-key")
-                    if self.api_key:
+                    api_key = get_secret("pipeline/openai-api-key")
+                    if api_key:
                         logger.debug("Using OPENAI_API_KEY from AWS Secrets Manager for DALL-E")
                 except Exception as e:
-                    logger.debug(f"Could not retrieve OPENAI_API_KEY from Secrets Manager: {e}, falling back to .env file")
-                    self.api_key = settings.OPENAI_API_KEY
+                    logger.debug(
+                        "Could not retrieve OPENAI_API_KEY from Secrets Manager: %s, falling back to .env file", e
+                    )
+                    api_key = settings.OPENAI_API_KEY
         
-        if not self.api_key:
+        if not api_key:
             logger.warning(
                 "OPENAI_API_KEY not set - DALL-E generation will fail. "
                 "Add it to AWS Secrets Manager (pipeline/openai-api-key) or .env file."
             )
+        return api_key
 
-        # Initialize client (error will be caught in generate_image if api_key is None)
-        self.client = AsyncOpenAI(api_key=self.api_key) if self.api_key else None
-
-        # DALL-E 3 pricing (as of 2024)
-        self.costs = {
-            "standard": 0.040,  # $0.04 per image (1024x1024 or 1792x1024)
-            "hd": 0.080  # $0.08 per image HD quality
-        }
+    @cached_property
+    def client(self) -> Optional[AsyncOpenAI]:
+        """OpenAI client, created on first access (None if no API key)."""
+        # Shares the process-wide HTTP/2 pool, so concurrent DALL-E calls
+        # multiplex over one connection instead of one TLS handshake each
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            http_client=get_openai_http_client()
+        ) if self.api_key else None
 
     async def generate_image(
         self,
@@ -91,39 +175,108 @@ class DALLEGenerator:
                 "cost": float,
                 "duration": float,
                 "prompt_used": str,
+                "cached": bool (True if served from the prompt cache),
                 "error": str (if failed)
             }
         """
+        # Build enhanced prompt for educational content
+        enhanced_prompt = self._enhance_prompt(prompt, style)
+        return await self._generate_enhanced(enhanced_prompt, quality)
+
+    async def generate_images_batch(
+        self,
+        prompts: List[str],
+        style: str = "educational",
+        quality: str = "standard",
+        max_concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate several images concurrently.
+
+        DALL-E 3 only accepts n=1, so this issues one request per prompt, but
+        enhances every prompt up front and runs the requests together instead
+        of making callers schedule them one by one.
+
+        Args:
+            prompts: Descriptions of images to generate
+            style: Style hint applied to every prompt
+            quality: "standard" or "hd"
+            max_concurrency: Optional cap on requests in flight
+
+        Returns:
+            One result dict per prompt (same shape as generate_image),
+            in the same order as ``prompts``
+        """
+        enhanced_prompts = [self._enhance_prompt(p, style) for p in prompts]
+        # Identical prompts in one batch would all miss the cache concurrently,
+        # so generate each distinct prompt once and share the result
+        unique_prompts = list(dict.fromkeys(enhanced_prompts))
+        semaphore = asyncio.Semaphore(max_concurrency or max(1, len(unique_prompts)))
+
+        async def _run(enhanced_prompt: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._generate_enhanced(enhanced_prompt, quality)
+
+        unique_results = await asyncio.gather(*(_run(p) for p in unique_prompts))
+        by_prompt = dict(zip(unique_prompts, unique_results))
+
+        # Reassemble in input order; repeats of a prompt are free cache hits
+        results = []
+        seen = set()
+        for enhanced_prompt in enhanced_prompts:
+            result = by_prompt[enhanced_prompt]
+            if enhanced_prompt in seen and result["success"]:
+                result = {**result, "cost": 0.0, "cached": True}
+            seen.add(enhanced_prompt)
+            results.append(result)
+        return results
+
+    async def _generate_enhanced(
+        self,
+        enhanced_prompt: str,
+        quality: str
+    ) -> Dict[str, Any]:
+        """Call DALL-E 3 with an already-enhanced prompt (served from cache when possible)."""
         start_time = time.time()
 
+        key = _cache_key(enhanced_prompt, quality)
+        cached_url = _cache_get(key)
+        if cached_url:
+            logger.info("DALL-E 3 cache hit: %.100s...", enhanced_prompt)
+            return {
+                "success": True,
+                "url": cached_url,
+                "cost": 0.0,
+                "duration": time.time() - start_time,
+                "prompt_used": enhanced_prompt,
+                "quality": quality,
+                "cached": True
+            }
+
         try:
             if not self.api_key:
                 raise ValueError("OPENAI_API_KEY not configured")
 
-            # Build enhanced prompt for educational content
-            enhanced_prompt = self._enhance_prompt(prompt, style)
-
-            logger.info(f"Generating DALL-E 3 image: {enhanced_prompt[:100]}...")
+            logger.info("Generating DALL-E 3 image: %.100s...", enhanced_prompt)
 
             # Call DALL-E 3 API
             response = await self.client.images.generate(
                 model="dall-e-3",
                 prompt=enhanced_prompt,
-                size="1792x1024",  # Landscape for video (16:9 aspect ratio)
+                size=IMAGE_SIZE,
                 quality=quality,  # "standard" or "hd"
                 n=1
             )
 
             image_url = response.data[0].url
+            _cache_put(key, image_url)
 
             # Calculate cost
             cost = self.costs.get(quality, self.costs["standard"])
 
             duration = time.time() - start_time
 
-            logger.info(
-                f"DALL-E 3 image generated in {duration:.2f}s (${cost})"
-            )
+            logger.info("DALL-E 3 image generated in %.2fs ($%s)", duration, cost)
 
             return {
                 "success": True,
@@ -131,12 +284,13 @@ class DALLEGenerator:
                 "cost": cost,
                 "duration": duration,
                 "prompt_used": enhanced_prompt,
-                "quality": quality
+                "quality": quality,
+                "cached": False
             }
 
         except Exception as e:
             duration = time.time() - start_time
-            logger.error(f"DALL-E 3 generation failed: {e}")
+            logger.error("DALL-E 3 generation failed: %s", e)
 
             return {
                 "success": False,
@@ -146,6 +300,15 @@ class DALLEGenerator:
                 "error": str(e)
             }
 
+    async def aclose(self):
+        """
+        Release the OpenAI client.
+
+        The underlying HTTP pool is shared process-wide, so it is left open
+        for other generators rather than closed here.
+        """
+        self.__dict__.pop("client", None)
+
     def _enhance_prompt(self, base_prompt: str, style: str) -> str:
         """
         Add style guidelines to prompt for consistent educational visuals.
@@ -157,34 +320,10 @@ class DALLEGenerator:
         Returns:
             Enhanced prompt with style guidance
         """
-        style_guides = {
-            "educational": (
-                "Educational diagram style, clean and clear, bright colors, "
-                "labeled components, appropriate for middle school students "
-                "(grades 6-7), scientific accuracy, professional quality, "
-                "no text in image"
-            ),
-            "realistic": (
-                "Photorealistic style, high detail, natural lighting, "
-                "scientific accuracy, professional photography quality"
-            ),
-            "illustration": (
-                "Hand-drawn illustration style, colorful, engaging for students, "
-                "clear visual hierarchy, educational diagram quality"
-            ),
-            "diagram": (
-                "Technical diagram style, clean lines, clear labels, "
-                "educational infographic quality, bright colors on white background"
-            )
-        }
-
-        guide = style_guides.get(style, style_guides["educational"])
-
-        # Combine prompt with style guide
-        enhanced = f"{base_prompt}. {guide}"
-
-        # Ensure prompt isn't too long (DALL-E 3 has limits)
-        if len(enhanced) > 4000:
-            enhanced = enhanced[:3997] + "..."
+        guide = STYLE_GUIDES.get(style, STYLE_GUIDES["educational"])
 
-        return enhanced
+        # Combine prompt with style guide, truncating only the base prompt so
+        # the result stays within DALL-E 3's limit without building the full
+        # string first (and the style guide is never cut off)
+        max_base = MAX_PROMPT_CHARS - len(guide) - 2
+        return f"{base_prompt[:max_base]}. {guide}"
@@ -4,26 +4,169 @@ Template Matcher Agent
 Finds the best matching educational template based on visual guidance
 and key concepts from script.
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from app.database import SessionLocal
 from app.models.database import Template
-from typing import List, Optional, Dict, Any
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
 import logging
+import threading
+import time
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional accelerator
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+KEYWORD_WEIGHT = 2  # Weight keyword matches heavily
+CATEGORY_WEIGHT = 1
+TEMPLATE_CACHE_TTL = 60  # Seconds before the template catalog is reloaded
+
+
+@dataclass(slots=True)
+class TemplateLite:
+    """Detached, read-only copy of a Template row with match text precomputed."""
+    id: int
+    template_id: str
+    name: str
+    category: str
+    psd_url: Optional[str]
+    preview_url: Optional[str]
+    editable_layers: Any
+    keywords: List[str]
+    updated_at: Optional[datetime]
+    keywords_lower: Tuple[str, ...]
+    category_text: str  # Lowercased category with underscores as spaces
+    position: int  # Load order; breaks score ties like the original scan did
+    max_score: int  # Upper bound of _calculate_match_score for this template
+
+    @classmethod
+    def from_row(cls, template: Any, position: int) -> "TemplateLite":
+        """Build from a Template row (ORM object or Core Row with the same names)."""
+        keywords = template.keywords or []
+        return cls(
+            id=template.id,
+            template_id=template.template_id,
+            name=template.name,
+            category=template.category,
+            psd_url=template.psd_url,
+            preview_url=template.preview_url,
+            editable_layers=template.editable_layers,
+            keywords=keywords,
+            updated_at=template.updated_at,
+            keywords_lower=tuple(keyword.lower() for keyword in keywords),
+            category_text=template.category.lower().replace('_', ' '),
+            position=position,
+            max_score=KEYWORD_WEIGHT * len(keywords) + CATEGORY_WEIGHT,
+        )
+
+
+class _KeywordAutomaton:
+    """
+    Aho-Corasick automaton over every template keyword and category phrase.
+
+    One linear pass over the search text finds all matching phrases; scores
+    are then summed through a phrase -> [(template id, weight)] posting list.
+    Scoring is identical to _calculate_match_score: each phrase counts once
+    per template no matter how often it appears in the text.
+    """
+
+    def __init__(self, templates: List[TemplateLite]):
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for template in templates:
+            for keyword in template.keywords_lower:
+                postings[keyword].append((template.id, KEYWORD_WEIGHT))
+            postings[template.category_text].append((template.id, CATEGORY_WEIGHT))
+
+        # An empty phrase is a substring of any text, so it always scores
+        self.always = postings.pop("", [])
+
+        self.automaton = ahocorasick.Automaton()
+        for phrase, phrase_postings in postings.items():
+            self.automaton.add_word(phrase, (phrase, phrase_postings))
+        self.automaton.make_automaton()
+
+    def score(self, search_text: str) -> Dict[int, int]:
+        """Return {template id: score} for templates with any match."""
+        matched = {}
+        for _, (phrase, phrase_postings) in self.automaton.iter(search_text):
+            matched[phrase] = phrase_postings
+
+        scores: Dict[int, int] = defaultdict(int)
+        for phrase_postings in (self.always, *matched.values()):
+            for template_id, weight in phrase_postings:
+                scores[template_id] += weight
+        return scores
+
+
+# Automaton for the current template catalog, rebuilt when any template is
+# added, removed or updated: (signature, automaton)
+_automaton_cache: Optional[Tuple[tuple, _KeywordAutomaton]] = None
+
+
+def _get_automaton(templates: List[TemplateLite]) -> Optional[_KeywordAutomaton]:
+    """Return the keyword automaton for these templates (None if unavailable)."""
+    global _automaton_cache
+    if ahocorasick is None:
+        return None
+
+    signature = tuple((t.id, t.updated_at) for t in templates)
+    if _automaton_cache is None or _automaton_cache[0] != signature:
+        _automaton_cache = (signature, _KeywordAutomaton(templates))
+        logger.debug(f"Built template keyword automaton ({len(templates)} templates)")
+    return _automaton_cache[1]
+
 
 class TemplateMatcher:
     """Matches script content to educational templates."""
 
-    def __init__(self):
-        self.db: Optional[Session] = None
+    # Shared template catalog: {"templates": (expiry_timestamp, templates)}
+    _CACHE: Dict[str, Tuple[float, List[TemplateLite]]] = {}
+    _cache_lock = threading.Lock()
 
-    def _get_db(self) -> Session:
-        """Get database session."""
-        if self.db is None:
-            self.db = SessionLocal()
-        return self.db
+    def _get_templates(self) -> List[TemplateLite]:
+        """
+        Return the template catalog, reloading it at most every
+        TEMPLATE_CACHE_TTL seconds.
+
+        Templates are ordered by max_score (highest first) so scoring can
+        stop once no remaining template can beat the leader.
+        """
+        with self._cache_lock:
+            cached = self._CACHE.get("templates")
+            if cached is not None and time.time() < cached[0]:
+                return cached[1]
+
+        # Short-lived session: the connection goes straight back to the pool
+        with SessionLocal() as db:
+            # Plain column rows skip ORM hydration and identity-map bookkeeping
+            rows = db.execute(
+                select(
+                    Template.id,
+                    Template.template_id,
+                    Template.name,
+                    Template.category,
+                    Template.psd_url,
+                    Template.preview_url,
+                    Template.editable_layers,
+                    Template.keywords,
+                    Template.updated_at,
+                ).execution_options(yield_per=200)
+            )
+            templates = [
+                TemplateLite.from_row(row, position)
+                for position, row in enumerate(rows)
+            ]
+        templates.sort(key=lambda t: t.max_score, reverse=True)
+
+        with self._cache_lock:
+            self._CACHE["templates"] = (time.time() + TEMPLATE_CACHE_TTL, templates)
+        logger.debug(f"Loaded {len(templates)} templates into cache")
+        return templates
 
     def match_template(
         self,
@@ -41,100 +184,109 @@ class TemplateMatcher:
             Template dict or None if no match found
         """
         try:
-            db = self._get_db()
-
-            # Load all templates
-            templates = db.query(Template).all()
+            # Load all templates (cached between calls)
+            templates = self._get_templates()
 
             if not templates:
                 logger.warning("No templates found in database")
                 return None
 
-            # Score each template based on keyword matches
-            best_match = None
-            best_score = 0
+            # Combine all text to search (once, not per template)
+            search_text = (
+                f"{visual_guidance} {' '.join(key_concepts)}"
+            ).lower()
 
-            for template in templates:
-                score = self._calculate_match_score(
-                    template,
-                    visual_guidance,
-                    key_concepts
+            # Score each template based on keyword matches.
+            # Highest score wins; ties go to the earliest loaded template.
+            automaton = _get_automaton(templates)
+            if automaton is not None:
+                # Single pass over the text scores every template at once,
+                # so picking the winner is a single C-level reduction
+                scores = automaton.score(search_text)
+                best_match = max(
+                    templates,
+                    key=lambda t: (scores.get(t.id, 0), -t.position)
+                )
+                best_score = scores.get(best_match.id, 0)
+            else:
+                best_match, best_score = self._best_by_substring_scan(
+                    templates, search_text
                 )
-
-                if score > best_score:
-                    best_score = score
-                    best_match = template
 
             # Require minimum score threshold
             if best_score < 1:
                 logger.debug("No template matched above threshold")
                 return None
 
-            if best_match:
-                logger.info(
-                    f"Matched template: {best_match.name} "
-                    f"(score: {best_score})"
-                )
-
-                return {
-                    'id': best_match.id,
-                    'template_id': best_match.template_id,
-                    'name': best_match.name,
-                    'category': best_match.category,
-                    'psd_url': best_match.psd_url,
-                    'preview_url': best_match.preview_url,
-                    'editable_layers': best_match.editable_layers,
-                    'keywords': best_match.keywords
-                }
+            logger.info(
+                f"Matched template: {best_match.name} "
+                f"(score: {best_score})"
+            )
 
-            return None
+            return {
+                'id': best_match.id,
+                'template_id': best_match.template_id,
+                'name': best_match.name,
+                'category': best_match.category,
+                'psd_url': best_match.psd_url,
+                'preview_url': best_match.preview_url,
+                'editable_layers': best_match.editable_layers,
+                'keywords': best_match.keywords
+            }
 
         except Exception as e:
             logger.error(f"Template matching error: {e}")
             return None
 
+    def _best_by_substring_scan(
+        self,
+        templates: List[TemplateLite],
+        search_text: str
+    ) -> Tuple[Optional[TemplateLite], int]:
+        """
+        Score templates one by one, stopping once no remaining template can
+        beat the leader (templates are sorted by max_score, highest first).
+
+        Returns:
+            (best template, its score); (None, 0) if nothing scored
+        """
+        best_match = None
+        best_key = (0, float('-inf'))
+        for template in templates:
+            if template.max_score < best_key[0]:
+                break  # Sorted by bound: nothing left can beat or tie the leader
+
+            score = self._calculate_match_score(template, search_text)
+            key = (score, -template.position)
+            if key > best_key:
+                best_key = key
+                best_match = template
+        return best_match, best_key[0]
+
     def _calculate_match_score(
         self,
-        template: Template,
-        visual_guidance: str,
-        key_concepts: List[str]
+        template: TemplateLite,
+        search_text: str
     ) -> int:
         """
         Calculate match score for a template.
 
         Args:
             template: Template to score
-            visual_guidance: Visual description
-            key_concepts: Key concepts list
+            search_text: Lowercased visual guidance and key concepts
 
         Returns:
             Match score (higher is better)
         """
         score = 0
-        template_keywords = template.keywords or []
-
-        # Combine all text to search
-        search_text = (
-            f"{visual_guidance} {' '.join(key_concepts)}"
-        ).lower()
 
-        # Check keyword matches
-        for keyword in template_keywords:
-            if keyword.lower() in search_text:
-                score += 2  # Weight keyword matches heavily
+        # Check keyword matches (substring, so "cell" also matches "cells")
+        for keyword in template.keywords_lower:
+            if keyword in search_text:
+                score += KEYWORD_WEIGHT
 
         # Check category in text
-        if template.category.lower().replace('_', ' ') in search_text:
-            score += 1
+        if template.category_text in search_text:
+            score += CATEGORY_WEIGHT
 
         return score
-
-    def close(self):
-        """Close database connection."""
-        if self.db:
-            self.db.close()
-            self.db = None
-
-    def __del__(self):
-        """Cleanup on deletion."""
-        self.close()
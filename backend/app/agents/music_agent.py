@@ -3,21 +3,43 @@ Music Selection and Processing Agent.
 
 Handles selecting appropriate background music and processing it for videos.
 """
+import asyncio
+import logging
 import os
+import random
+import re
 import subprocess
 import tempfile
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
+from urllib.parse import urlparse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.models.database import MusicTrack
 from app.services.storage import StorageService
 
+logger = logging.getLogger(__name__)
+
+# Virtual-hosted S3 hosts: bucket.s3.amazonaws.com or bucket.s3.region.amazonaws.com
+_S3_HOST_RE = re.compile(r'[^.]+\.s3(?:\.[^.]+)?\.amazonaws\.com')
+
 
 class MusicSelectionAgent:
     """
     Selects appropriate background music based on script content and mood.
     """
 
+    # Mood keywords
+    _ENERGETIC = frozenset({"exciting", "amazing", "discover", "explore", "wonder", "incredible", "wow"})
+    _CALM = frozenset({"understand", "learn", "explain", "process", "think", "consider", "observe"})
+    _INSPIRING = frozenset({"achieve", "grow", "transform", "create", "build", "empower", "potential"})
+
+    # Finds every mood keyword in one scan. Keywords match as substrings
+    # ("discovered" counts for "discover"); the lookahead keeps overlapping hits.
+    _MOOD_KEYWORD_RE = re.compile(
+        "(?=(" + "|".join(sorted(_ENERGETIC | _CALM | _INSPIRING)) + "))"
+    )
+
     def __init__(self, db: Session, storage_service: Optional[StorageService] = None):
         self.db = db
         self.storage_service = storage_service or StorageService()
@@ -44,20 +66,20 @@ class MusicSelectionAgent:
             mood_preference = self._analyze_script_mood(script)
 
         # Query music tracks matching category and sufficient duration
-        track = self.db.query(MusicTrack).filter(
+        track = self._pick_random_track(
             MusicTrack.category == mood_preference,
             MusicTrack.duration >= video_duration
-        ).order_by(func.random()).first()
+        )
 
         if not track:
             # Fallback to any track with sufficient duration
-            track = self.db.query(MusicTrack).filter(
+            track = self._pick_random_track(
                 MusicTrack.duration >= video_duration
-            ).order_by(func.random()).first()
+            )
 
         if not track:
             # No tracks available at all
-            print("⚠️  No music tracks found in database")
+            logger.warning("No music tracks found in database")
             return None
 
         return {
@@ -69,6 +91,29 @@ class MusicSelectionAgent:
             "volume": 0.15  # 15% volume (background)
         }
 
+    def _pick_random_track(self, *criteria) -> Optional[MusicTrack]:
+        """
+        Pick a uniformly random track matching the filter criteria.
+
+        Counts the matches and jumps to a random offset instead of
+        ORDER BY RANDOM(), which would assign a random key to and sort
+        every qualifying row.
+        """
+        base = self.db.query(MusicTrack.id).filter(*criteria)
+
+        count = base.with_entities(func.count(MusicTrack.id)).scalar()
+        if not count:
+            return None
+
+        track_id = base.order_by(MusicTrack.id).offset(
+            random.randrange(count)
+        ).limit(1).scalar()
+        if track_id is None:
+            # Row removed between the count and the pick
+            return None
+
+        return self.db.get(MusicTrack, track_id)
+
     def _analyze_script_mood(self, script: Dict[str, Any]) -> str:
         """
         Analyze script and determine appropriate music mood.
@@ -86,15 +131,21 @@ class MusicSelectionAgent:
 
         text = " ".join(text_parts).lower()
 
-        # Keyword-based mood detection
-        energetic_keywords = ["exciting", "amazing", "discover", "explore", "wonder", "incredible", "wow"]
-        calm_keywords = ["understand", "learn", "explain", "process", "think", "consider", "observe"]
-        inspiring_keywords = ["achieve", "grow", "transform", "create", "build", "empower", "potential"]
+        return self._mood_from_text(text)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _mood_from_text(text: str) -> str:
+        """Keyword mood for lowercased script text (memoized for retries)."""
+        agent = MusicSelectionAgent
+
+        # Keyword-based mood detection: collect the distinct keywords once
+        found = set(agent._MOOD_KEYWORD_RE.findall(text))
 
         # Count keyword matches
-        energetic_score = sum(1 for word in energetic_keywords if word in text)
-        calm_score = sum(1 for word in calm_keywords if word in text)
-        inspiring_score = sum(1 for word in inspiring_keywords if word in text)
+        energetic_score = len(found & agent._ENERGETIC)
+        calm_score = len(found & agent._CALM)
+        inspiring_score = len(found & agent._INSPIRING)
 
         # Return category with highest score
         if energetic_score > calm_score and energetic_score > inspiring_score:
@@ -151,26 +202,52 @@ class MusicProcessingService:
 
             # Build FFmpeg command
             # Trim to duration, add fade in/out, adjust volume
-            fade_out_start = max(0, target_duration - fade_out)
+            fade_out_start = target_duration - fade_out
+
+            audio_filters = []
+            if fade_in > 0:
+                audio_filters.append(f'afade=t=in:st=0:d={fade_in}')
+            if fade_out > 0 and fade_out_start > 0:
+                # Skip the fade out when the clip is shorter than the fade
+                audio_filters.append(f'afade=t=out:st={fade_out_start}:d={fade_out}')
+            if volume != 1.0:
+                audio_filters.append(f'volume={volume}')
 
             ffmpeg_cmd = [
                 'ffmpeg',
                 '-y',  # Overwrite output file
+                '-loglevel', 'error',  # Only report errors
+                '-nostats',  # No progress lines on stderr
                 '-i', original_path,
+                '-map', '0:a',  # Audio only (drops embedded cover art)
+                '-vn',
                 '-t', str(target_duration),
-                '-af', f'afade=t=in:st=0:d={fade_in},afade=t=out:st={fade_out_start}:d={fade_out},volume={volume}',
-                '-c:a', 'libmp3lame',
-                '-b:a', '128k',
-                output_path
+                '-threads', '2',
             ]
-
-            # Run FFmpeg
-            result = subprocess.run(
-                ffmpeg_cmd,
-                capture_output=True,
-                text=True,
-                check=True
+            if audio_filters:
+                ffmpeg_cmd += [
+                    '-af', ','.join(audio_filters),
+                    '-c:a', 'libmp3lame',
+                    '-q:a', '4',  # VBR (~165kbps), faster than 128k CBR
+                ]
+            else:
+                # Plain trim: copy the MP3 frames without re-encoding
+                ffmpeg_cmd += ['-c:a', 'copy']
+            ffmpeg_cmd.append(output_path)
+
+            # Run FFmpeg without blocking the event loop
+            # (stderr is kept only for error reporting)
+            proc = await asyncio.create_subprocess_exec(
+                *ffmpeg_cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
             )
+            _, stderr = await proc.communicate()
+            if proc.returncode:
+                raise subprocess.CalledProcessError(
+                    proc.returncode, ffmpeg_cmd, stderr=stderr
+                )
 
             # Upload processed track to S3
             upload_result = await self.storage_service.upload_local_file(
@@ -190,27 +267,29 @@ class MusicProcessingService:
             return upload_result["url"]
 
         except subprocess.CalledProcessError as e:
-            print(f"❌ FFmpeg error processing music: {e.stderr}")
+            logger.error(
+                "FFmpeg error processing music: %s",
+                e.stderr.decode(errors='replace') if e.stderr else ''
+            )
             return None
         except Exception as e:
-            print(f"❌ Error processing music: {e}")
+            logger.error("Error processing music: %s", e)
             return None
 
     async def _download_from_s3(self, s3_url: str, local_path: str):
         """Download file from S3 URL to local path using StorageService."""
-        import re
-
         # Parse S3 URL to get S3 key
-        # Format: https://bucket.s3.region.amazonaws.com/key
-        match = re.match(r'https://[^.]+\.s3\.[^.]+\.amazonaws\.com/(.+)', s3_url)
-        if not match:
+        # Format: https://bucket.s3[.region].amazonaws.com/key
+        parsed = urlparse(s3_url)
+        s3_key = parsed.path.lstrip('/')
+        if (
+            parsed.scheme != 'https'
+            or not _S3_HOST_RE.fullmatch(parsed.netloc)
+            or not s3_key
+        ):
             raise ValueError(f"Invalid S3 URL format: {s3_url}")
 
-        s3_key = match.group(1)
-
-        # Download using StorageService
-        file_content = self.storage_service.read_file(s3_key)
-
-        # Write to local path
+        # Stream straight to disk using StorageService (blocking boto3
+        # transfer runs in a worker thread)
         with open(local_path, 'wb') as f:
-            f.write(file_content)
+            await asyncio.to_thread(self.storage_service.download_fileobj, s3_key, f)
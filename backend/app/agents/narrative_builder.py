@@ -9,16 +9,153 @@ It creates a 4-part structure (hook, concept, process, conclusion) with:
 - Key concepts to highlight
 """
 
+import copy
+import hashlib
 import time
 import json
 import logging
 import uuid
-from typing import Optional, List, Dict, Any
+from collections import OrderedDict
+from typing import Final, Optional, List, Dict, Any, Tuple
 import replicate
+from pydantic import BaseModel, ConfigDict, ValidationError
 from app.agents.base import AgentInput, AgentOutput
+from app.services.llm_stream import stream_json_prediction
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Parses the first JSON value at an offset and ignores whatever follows it
+_DECODER = json.JSONDecoder()
+
+# Recently built scripts keyed by request content, so retries of the same
+# topic/objective/key points skip the LLM: {key: (script, expiry_timestamp)}
+_script_cache: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+SCRIPT_CACHE_MAX_ENTRIES = 128
+SCRIPT_CACHE_TTL_SECONDS = 10 * 60
+
+
+def _script_cache_key(topic: str, learning_objective: str, key_points: List[str]) -> str:
+    """Content-addressed key for a narrative request."""
+    payload = json.dumps([topic, learning_objective, list(key_points)])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _script_cache_get(key: str) -> Optional[dict]:
+    """Return a copy of a cached, unexpired script and mark it recently used."""
+    entry = _script_cache.get(key)
+    if entry is None:
+        return None
+    script, expiry = entry
+    if time.time() >= expiry:
+        del _script_cache[key]
+        return None
+    _script_cache.move_to_end(key)
+    return copy.deepcopy(script)
+
+
+def _script_cache_put(key: str, script: dict) -> None:
+    """Store a validated script, evicting the least recently used entries."""
+    _script_cache[key] = (copy.deepcopy(script), time.time() + SCRIPT_CACHE_TTL_SECONDS)
+    _script_cache.move_to_end(key)
+    while len(_script_cache) > SCRIPT_CACHE_MAX_ENTRIES:
+        _script_cache.popitem(last=False)
+
+
+class ScriptPart(BaseModel):
+    """One part of the 4-part script, as returned by the LLM."""
+    # Strict: no coercion (e.g. "15" is rejected as a duration, as before)
+    model_config = ConfigDict(strict=True)
+
+    narration: str
+    duration: float  # ints are accepted
+    visual_guidance: str
+    key_concepts: List[Any]
+
+
+class ScriptModel(BaseModel):
+    """Validation model for the full LLM script (extra keys are ignored)."""
+    model_config = ConfigDict(strict=True)
+
+    hook: ScriptPart
+    concept: ScriptPart
+    process: ScriptPart
+    conclusion: ScriptPart
+
+
+# Static system prompt, built once at import
+_SYSTEM_PROMPT: Final[str] = """You are an expert video script writer and educational content creator. Your task is to create engaging, concise scripts for 60-second educational videos.
+
+You must create a script with EXACTLY 4 parts:
+1. HOOK (10-15 seconds) - Grab attention, pose a question or intriguing statement
+2. CONCEPT (15-20 seconds) - Introduce the main idea/learning objective
+3. PROCESS (20-25 seconds) - Explain how it works, key steps, or main points
+4. CONCLUSION (10 seconds) - Summarize key takeaway and call-to-action
+
+For each part, you must provide:
+- narration: The exact script text to be spoken
+- duration: Suggested duration in seconds
+- visual_guidance: Description of what should be shown on screen
+- key_concepts: Array of 1-3 key terms/concepts to highlight visually
+
+The narration should be:
+- Conversational and engaging
+- Clear and concise
+- Suitable for voice-over
+- Timed appropriately for the duration
+
+The visual guidance should be:
+- Specific and actionable
+- Describe scenes, graphics, text overlays, or animations
+- Support the narration
+
+You MUST respond with valid JSON in this exact structure:
+{
+  "hook": {
+    "narration": "string",
+    "duration": number,
+    "visual_guidance": "string",
+    "key_concepts": ["string"]
+  },
+  "concept": {
+    "narration": "string",
+    "duration": number,
+    "visual_guidance": "string",
+    "key_concepts": ["string"]
+  },
+  "process": {
+    "narration": "string",
+    "duration": number,
+    "visual_guidance": "string",
+    "key_concepts": ["string"]
+  },
+  "conclusion": {
+    "narration": "string",
+    "duration": number,
+    "visual_guidance": "string",
+    "key_concepts": ["string"]
+  }
+}
+
+Do not include any text before or after the JSON object."""
+
+_USER_PROMPT_TMPL: Final[str] = """Create a 60-second video script about the following topic:
+
+TOPIC: {topic}
+
+LEARNING OBJECTIVE: {learning_objective}
+
+KEY POINTS TO COVER:
+{key_points}
+
+Remember to create an engaging hook, clearly explain the concept, walk through the process/key points, and end with a strong conclusion. The total duration should be approximately 60 seconds across all 4 parts.
+
+Respond with ONLY the JSON object, no additional text."""
+
 
 class NarrativeBuilderAgent:
     """
@@ -94,7 +231,10 @@ class NarrativeBuilderAgent:
         Main processing method that generates the narrative script.
 
         Args:
-            input: AgentInput containing user_id, topic, learning_objective, and key_points
+            input: AgentInput containing user_id, topic, learning_objective, and key_points,
+                plus optional cache_mode: reuse a script generated in the last
+                10 minutes for an identical request (default:
+                settings.NARRATIVE_BUILDER_CACHE_MODE, off unless configured)
 
         Returns:
             AgentOutput with success status, script data, cost, and duration
@@ -122,18 +262,36 @@ class NarrativeBuilderAgent:
             logger.info(f"[{session_id}] Building narrative for topic: {topic}")
             logger.info(f"[{session_id}] User ID: {user_id}, Key Points: {len(key_points)}")
 
-            # Build prompts
-            system_prompt = self._build_system_prompt()
-            user_prompt = self._build_user_prompt(topic, learning_objective, key_points)
+            # Reuse a recent script for an identical request (e.g. a retry)
+            # only when opted in: scripts are sampled, so a regenerate should
+            # normally get a new one
+            from app.config import get_settings
+            cache_mode = input.data.get(
+                "cache_mode", get_settings().NARRATIVE_BUILDER_CACHE_MODE
+            )
+            cache_key = _script_cache_key(topic, learning_objective, key_points)
+            script = _script_cache_get(cache_key) if cache_mode else None
+            cost = 0.0
+
+            if script is not None:
+                logger.info(f"[{session_id}] Reusing cached narrative for topic: {topic}")
+            else:
+                # Build prompts
+                system_prompt = self._build_system_prompt()
+                user_prompt = self._build_user_prompt(topic, learning_objective, key_points)
+
+                # Call LLM to generate narrative
+                llm_response = await self._call_llm(system_prompt, user_prompt)
 
-            # Call LLM to generate narrative
-            llm_response = await self._call_llm(system_prompt, user_prompt)
+                # Parse the response into structured script
+                script = self._parse_script_response(llm_response)
 
-            # Parse the response into structured script
-            script = self._parse_script_response(llm_response)
+                # Validate script structure
+                self._validate_script(script)
 
-            # Validate script structure
-            self._validate_script(script)
+                if cache_mode:
+                    _script_cache_put(cache_key, script)
+                cost = self.cost_per_call
 
             duration = time.time() - start_time
 
@@ -148,7 +306,7 @@ class NarrativeBuilderAgent:
                     "topic": topic,
                     "learning_objective": learning_objective
                 },
-                cost=self.cost_per_call,
+                cost=cost,
                 duration=duration,
                 error=None
             )
@@ -165,60 +323,7 @@ class NarrativeBuilderAgent:
 
     def _build_system_prompt(self) -> str:
         """Build the system prompt for the LLM."""
-        return """You are an expert video script writer and educational content creator. Your task is to create engaging, concise scripts for 60-second educational videos.
-
-You must create a script with EXACTLY 4 parts:
-1. HOOK (10-15 seconds) - Grab attention, pose a question or intriguing statement
-2. CONCEPT (15-20 seconds) - Introduce the main idea/learning objective
-3. PROCESS (20-25 seconds) - Explain how it works, key steps, or main points
-4. CONCLUSION (10 seconds) - Summarize key takeaway and call-to-action
-
-For each part, you must provide:
-- narration: The exact script text to be spoken
-- duration: Suggested duration in seconds
-- visual_guidance: Description of what should be shown on screen
-- key_concepts: Array of 1-3 key terms/concepts to highlight visually
-
-The narration should be:
-- Conversational and engaging
-- Clear and concise
-- Suitable for voice-over
-- Timed appropriately for the duration
-
-The visual guidance should be:
-- Specific and actionable
-- Describe scenes, graphics, text overlays, or animations
-- Support the narration
-
-You MUST respond with valid JSON in this exact structure:
-{
-  "hook": {
-    "narration": "string",
-    "duration": number,
-    "visual_guidance": "string",
-    "key_concepts": ["string"]
-  },
-  "concept": {
-    "narration": "string",
-    "duration": number,
-    "visual_guidance": "string",
-    "key_concepts": ["string"]
-  },
-  "process": {
-    "narration": "string",
-    "duration": number,
-    "visual_guidance": "string",
-    "key_concepts": ["string"]
-  },
-  "conclusion": {
-    "narration": "string",
-    "duration": number,
-    "visual_guidance": "string",
-    "key_concepts": ["string"]
-  }
-}
-
-Do not include any text before or after the JSON object."""
+        return _SYSTEM_PROMPT
 
     def _build_user_prompt(
         self,
@@ -227,20 +332,11 @@ Do not include any text before or after the JSON object."""
         key_points: List[str]
     ) -> str:
         """Build the user prompt with specific topic and requirements."""
-        key_points_formatted = "\n".join([f"- {point}" for point in key_points])
-
-        return f"""Create a 60-second video script about the following topic:
-
-TOPIC: {topic}
-
-LEARNING OBJECTIVE: {learning_objective}
-
-KEY POINTS TO COVER:
-{key_points_formatted}
-
-Remember to create an engaging hook, clearly explain the concept, walk through the process/key points, and end with a strong conclusion. The total duration should be approximately 60 seconds across all 4 parts.
-
-Respond with ONLY the JSON object, no additional text."""
+        return _USER_PROMPT_TMPL.format_map({
+            "topic": topic,
+            "learning_objective": learning_objective,
+            "key_points": "\n".join(f"- {point}" for point in key_points),
+        })
 
     async def _call_llm(self, system_prompt: str, user_prompt: str) -> str:
         """
@@ -258,21 +354,23 @@ Respond with ONLY the JSON object, no additional text."""
         
         logger.info("Calling Replicate API with Llama 3 70B...")
 
-        output = await self.client.async_run(
+        # Stream the output, cancelling the prediction as soon as the JSON
+        # object closes so trailing tokens are never generated
+        full_response = await stream_json_prediction(
+            self.client,
+            self.api_key,
             self.model,
             input={
                 "system_prompt": system_prompt,
                 "prompt": user_prompt,
-                "max_tokens": 2000,
+                # A 4-part script is ~600-800 tokens of JSON
+                "max_tokens": 1200,
                 "temperature": 0.7,
                 "top_p": 0.9,
                 "top_k": 50
             }
         )
 
-        # Concatenate streaming output
-        full_response = "".join([chunk for chunk in output])
-
         logger.info(f"Received LLM response: {len(full_response)} characters")
 
         return full_response
@@ -290,18 +388,25 @@ Respond with ONLY the JSON object, no additional text."""
         # Clean up response
         response = response.strip()
 
-        # Find JSON object boundaries
+        # Find the start of the JSON object; the decoder finds its end
         start_idx = response.find("{")
-        end_idx = response.rfind("}") + 1
 
-        if start_idx == -1 or end_idx == 0:
+        if start_idx == -1:
             raise ValueError("No JSON object found in LLM response")
 
-        json_str = response[start_idx:end_idx]
+        json_str = response[start_idx:]
 
         try:
-            script = json.loads(json_str)
-        except json.JSONDecodeError as e:
+            script = None
+            if orjson is not None:
+                try:
+                    script = orjson.loads(json_str)
+                except orjson.JSONDecodeError:
+                    pass  # e.g. trailing text after the object
+            if script is None:
+                script, _ = _DECODER.raw_decode(response, start_idx)
+        except ValueError as e:
+            # json.JSONDecodeError and orjson.JSONDecodeError both subclass ValueError
             logger.error(f"Failed to parse JSON: {e}")
             logger.error(f"JSON string: {json_str[:500]}...")
             raise ValueError(f"Invalid JSON in LLM response: {e}")
@@ -318,35 +423,19 @@ Respond with ONLY the JSON object, no additional text."""
         Raises:
             ValueError: If script is missing required parts or fields
         """
-        required_parts = ["hook", "concept", "process", "conclusion"]
-        required_fields = ["narration", "duration", "visual_guidance", "key_concepts"]
-
-        # Check all parts exist
-        for part in required_parts:
-            if part not in script:
-                raise ValueError(f"Script missing required part: {part}")
-
-            # Check all fields exist in each part
-            for field in required_fields:
-                if field not in script[part]:
-                    raise ValueError(f"Script part '{part}' missing required field: {field}")
-
-            # Validate types
-            if not isinstance(script[part]["narration"], str):
-                raise ValueError(f"Narration in '{part}' must be a string")
-
-            if not isinstance(script[part]["duration"], (int, float)):
-                raise ValueError(f"Duration in '{part}' must be a number")
-
-            if not isinstance(script[part]["visual_guidance"], str):
-                raise ValueError(f"Visual guidance in '{part}' must be a string")
-
-            if not isinstance(script[part]["key_concepts"], list):
-                raise ValueError(f"Key concepts in '{part}' must be an array")
+        # Part/field presence and types are checked by the compiled
+        # pydantic-core validator in one pass
+        try:
+            validated = ScriptModel.model_validate(script)
+        except ValidationError as e:
+            raise ValueError(f"Invalid script structure: {e}") from e
 
         # Check total duration is reasonable (45-75 seconds acceptable range)
-        total_duration = sum(
-            script[part]["duration"] for part in required_parts
+        total_duration = (
+            validated.hook.duration
+            + validated.concept.duration
+            + validated.process.duration
+            + validated.conclusion.duration
         )
 
         if total_duration < 45 or total_duration > 75:
@@ -10,15 +10,253 @@ Based on PRD Section 4.2.
 
 import json
 import time
-import random
+import asyncio
+import unicodedata
+import hashlib
 import logging
-from typing import Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional, Tuple
 import replicate
+from replicate.exceptions import ReplicateError
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
 
 from app.agents.base import AgentInput, AgentOutput
+from app.config import get_settings
+from app.services.llm_stream import stream_json_prediction
 
 logger = logging.getLogger(__name__)
 
+# Parses the first JSON value at an offset and ignores whatever follows it
+_DECODER = json.JSONDecoder()
+
+
+class _ImagePromptFields(BaseModel):
+    """Fields every LLM image prompt must carry (presence only; extras kept)."""
+    prompt: Any
+    negative_prompt: Any
+
+
+class _PromptParserFields(BaseModel):
+    """Required top-level fields of the LLM response."""
+    style_keywords: Any
+    image_prompts: list[_ImagePromptFields]
+
+
+# Punctuation (Unicode P*) that still changes what is asked for ("C#",
+# "100%", "R&D", "@handle", "5*"); kept in cache keys like symbols (S*)
+_MEANINGFUL_PUNCTUATION = frozenset("#%&@*")
+
+
+@lru_cache(maxsize=1024)
+def _folds_to_space(char: str) -> bool:
+    """Whether a character is formatting only: whitespace or plain punctuation."""
+    if char.isspace():
+        return True
+    return (
+        unicodedata.category(char).startswith("P")
+        and char not in _MEANINGFUL_PUNCTUATION
+    )
+
+
+def _normalize_prompt(text: str) -> str:
+    """
+    Fold surface differences that don't change the request: case, spacing
+    and punctuation ("Red  sports-car!" and "red sports car" normalize
+    alike). Word boundaries and symbols are kept, so "therapist" and "the
+    rapist", "C++" and "C#", or "🍕 party" and "🎉 party" stay distinct.
+    """
+    folded = "".join(
+        " " if _folds_to_space(char) else char for char in text.casefold()
+    )
+    return " ".join(folded.split())
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of raw LLM responses with a TTL.
+
+    Keys are content hashes of everything that shapes the LLM request, so an
+    identical request can skip the Replicate round-trip entirely.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # {key: (response, created_at)}
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(model: str, num_images: int, user_prompt: str, style_keywords: list[str]) -> str:
+        """
+        Stable key for an LLM request. Prompt and style keywords are
+        normalized so trivially different phrasings share an entry.
+        """
+        keywords = sorted({_normalize_prompt(k) for k in style_keywords})
+        raw = f"{model}|{num_images}|{_normalize_prompt(user_prompt)}|{keywords}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return an unexpired response and mark it recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        response, created_at = entry
+        if time.time() - created_at >= self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response, evicting the least recently used entries."""
+        self._entries[key] = (response, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Shared across agent instances (one per orchestrator)
+_response_cache = ResponseCache()
+
+# Generation parameters added to every image prompt (plus the consistency seed)
+_PROMPT_DEFAULTS = {"guidance_scale": 7.5, "variation_strength": 0.3}
+
+ENDPOINT_COOLDOWN_SECONDS = 30  # How long a failed endpoint is deprioritized
+
+
+class _ReplicateEndpoint:
+    """One Replicate endpoint (token / base URL) with its own concurrency cap."""
+
+    def __init__(
+        self,
+        api_token: str,
+        base_url: Optional[str] = None,
+        concurrency_limit: int = 10
+    ):
+        self.name = base_url or "replicate"
+        self.api_token = api_token
+        self.client = replicate.Client(api_token=api_token, base_url=base_url)
+        self.semaphore = asyncio.Semaphore(max(1, concurrency_limit))
+        self.outstanding = 0  # Requests waiting on or holding the semaphore
+        self.unhealthy_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.time() >= self.unhealthy_until
+
+    def mark_unhealthy(self) -> None:
+        self.unhealthy_until = time.time() + ENDPOINT_COOLDOWN_SECONDS
+
+
+# Invariant part of the system prompt. Keep it free of interpolated values,
+# timestamps or reordering: prefix caches only hit on byte-identical prefixes.
+_STATIC_SYSTEM_PREFIX = """You are an expert prompt engineer for AI advertising video generation.
+
+Your task: Extract subjects from the user's input and generate N varied image prompts, where N is the number of images given at the end of these instructions.
+
+STEP 1: SUBJECT EXTRACTION
+Analyze the input and identify ALL subjects (people, objects, products, animals, etc.).
+
+Examples:
+- "man buys hat" → subjects: ["man", "hat"]
+- "woman drinks coffee" → subjects: ["woman", "coffee"]
+- "red sports car" → subjects: ["sports car"]
+- "dog plays with ball" → subjects: ["dog", "ball"]
+
+STEP 2: GENERATE VARIATIONS
+For each subject, generate multiple variations with different:
+- Poses/angles (front, side, 3/4 view, close-up)
+- Styles/types (if applicable)
+- Lighting/mood
+- Composition
+
+Distribute N total prompts across all subjects.
+If 2 subjects: generate ~N/2 variations of each
+If 1 subject: generate N variations of it
+
+STEP 3: PROMPT STRUCTURE
+Each prompt should be detailed and specific:
+"[SHOT TYPE] professional photo of [SUBJECT with details], [POSE/ANGLE], [LIGHTING], [BACKGROUND], clean advertising photography, 8K, sharp focus"
+
+Examples:
+- "Medium shot professional photo of businessman in navy suit, front view facing camera with confident smile, soft studio lighting, white background, clean advertising photography, 8K, sharp focus"
+- "Close-up professional photo of brown fedora hat, side angle showing brim detail, dramatic side lighting, neutral gray background, clean advertising photography, 8K, sharp focus"
+
+STEP 4: OUTPUT FORMAT - Return ONLY valid JSON:
+{
+    "subjects": ["subject1", "subject2", ...],
+    "style_keywords": ["advertising", "professional", "clean"],
+    "image_prompts": [
+        {
+            "prompt": "[Detailed prompt]",
+            "negative_prompt": "blurry, low quality, distorted, amateur, watermark, text, multiple subjects",
+            "subject": "which subject this variation shows",
+            "variation_type": "front|side|close-up|3-4-view|detail"
+        },
+        ... (N total)
+    ]
+}
+
+CRITICAL RULES:
+- Each prompt generates ONE clear subject (not multiple subjects in same image)
+- Variations should be diverse (different angles, poses, styles)
+- Professional advertising quality
+- Clean, simple backgrounds (white, gray, or simple solid colors)
+- No text, watermarks, or clutter"""
+
+
+# Condensed variant of _STATIC_SYSTEM_PREFIX (~40% shorter): same rules,
+# one example per step, JSON schema kept verbatim. Enabled with
+# PROMPT_PARSER_COMPACT_PROMPT once canary parse rates match the verbose prompt.
+_COMPRESSED_SYSTEM_PREFIX = """You are an expert prompt engineer for AI advertising images.
+
+Task: extract ALL subjects (people, objects, products, animals) from the user's input, then write N varied image prompts (N is given at the end).
+Example: "man buys hat" → subjects: ["man", "hat"]
+
+Vary pose/angle (front, side, 3/4, close-up), style, lighting and composition. Split N across subjects (2 subjects: ~N/2 each; 1 subject: all N).
+
+Prompt format: "[SHOT TYPE] professional photo of [SUBJECT with details], [POSE/ANGLE], [LIGHTING], [BACKGROUND], clean advertising photography, 8K, sharp focus"
+Example: "Close-up professional photo of brown fedora hat, side angle showing brim detail, dramatic side lighting, neutral gray background, clean advertising photography, 8K, sharp focus"
+
+Return ONLY valid JSON:
+{
+    "subjects": ["subject1", "subject2", ...],
+    "style_keywords": ["advertising", "professional", "clean"],
+    "image_prompts": [
+        {
+            "prompt": "[Detailed prompt]",
+            "negative_prompt": "blurry, low quality, distorted, amateur, watermark, text, multiple subjects",
+            "subject": "which subject this variation shows",
+            "variation_type": "front|side|close-up|3-4-view|detail"
+        },
+        ... (N total)
+    ]
+}
+
+Rules: ONE clear subject per prompt; diverse variations; professional advertising quality; clean plain backgrounds (white, gray, solid color); no text, watermarks or clutter."""
+
+def _dynamic_suffix(num_images: int) -> str:
+    """Request-specific tail of the system prompt."""
+    return f"\n\nN = {num_images}. Generate exactly {num_images} prompts."
+
+
+@lru_cache(maxsize=16)
+def _system_prompt(num_images: int, compact: bool) -> str:
+    """
+    Full system prompt, built once per (num_images, compact).
+
+    Invariant instructions first, request-specific values last, so the
+    leading bytes are identical across requests (provider prefix caching).
+    """
+    prefix = _COMPRESSED_SYSTEM_PREFIX if compact else _STATIC_SYSTEM_PREFIX
+    return prefix + _dynamic_suffix(num_images)
+
 
 class PromptParserAgent:
     """
@@ -28,15 +266,34 @@ class PromptParserAgent:
     and generate consistent, professional prompts for multiple viewing angles.
     """
 
-    def __init__(self, replicate_api_key: str):
+    def __init__(
+        self,
+        replicate_api_key: str,
+        endpoints: Optional[list[dict[str, Any]]] = None,
+        timeout_s: float = 60.0
+    ):
         """
         Initialize the Prompt Parser Agent.
 
         Args:
             replicate_api_key: Replicate API key for LLM access
+            endpoints: Optional extra Replicate endpoints to spread load and
+                fail over to, each {"token", "base_url", "concurrency_limit"}
+                (token defaults to replicate_api_key)
+            timeout_s: Per-attempt limit on an LLM call, so a hung worker
+                fails over instead of holding its slot indefinitely
         """
         self.api_key = replicate_api_key
-        self.client = replicate.Client(api_token=replicate_api_key)
+        self.endpoints = [_ReplicateEndpoint(replicate_api_key)] + [
+            _ReplicateEndpoint(
+                api_token=endpoint.get("token") or replicate_api_key,
+                base_url=endpoint.get("base_url"),
+                concurrency_limit=endpoint.get("concurrency_limit", 10)
+            )
+            for endpoint in endpoints or []
+        ]
+        self.client = self.endpoints[0].client
+        self.timeout_s = timeout_s
         # Use the latest working Llama model
         self.model = "meta/meta-llama-3-70b-instruct"
 
@@ -49,6 +306,12 @@ class PromptParserAgent:
                 - data["user_prompt"]: User's product description
                 - data["options"]["num_images"]: Number of images to generate (default: 6)
                 - data["options"]["style_keywords"]: Optional style hints
+                - data["options"]["cache_mode"]: Opt in to reusing/storing
+                  LLM responses for identical inputs; generates at
+                  temperature 0 instead of 0.7 (default:
+                  settings.PROMPT_PARSER_CACHE_MODE, off unless configured)
+                - data["options"]["nonce"]: Optional value mixed into the
+                  consistency seed to get a fresh one for the same prompt
 
         Returns:
             AgentOutput containing:
@@ -57,46 +320,82 @@ class PromptParserAgent:
                 - data["product_category"]: Detected product category
                 - data["image_prompts"]: List of structured prompts with metadata
         """
-        try:
-            start_time = time.time()
+        # Set before the try so the error path can always compute duration
+        start_time = time.time()
 
+        try:
             # Extract input parameters
             user_prompt = input.data["user_prompt"]
             num_images = input.data.get("options", {}).get("num_images", 6)
             style_keywords = input.data.get("options", {}).get("style_keywords", [])
-
-            logger.info(
-                f"[{input.session_id}] Parsing prompt: '{user_prompt}' "
-                f"for {num_images} images"
+            # Cached responses are generated at temperature 0 so a hit is what a
+            # fresh call would most likely return; off by default so callers
+            # keep sampled (varied) prompts unless they or the deployment opt in
+            cache_mode = input.data.get("options", {}).get(
+                "cache_mode", get_settings().PROMPT_PARSER_CACHE_MODE
             )
 
-            # Generate consistency seed (same seed = similar visual style)
-            consistency_seed = random.randint(100000, 999999)
-
             # Build LLM system prompt
             system_prompt = self._build_system_prompt(num_images)
 
-            # Call Replicate Llama 3.1
-            llm_response = await self._call_llm(
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
-                style_keywords=style_keywords
+            cache_key = ResponseCache.make_key(
+                self.model, num_images, user_prompt, style_keywords
             )
+            llm_response = _response_cache.get(cache_key) if cache_mode else None
+            llm_task = None
+            cost = 0.0
+
+            if llm_response is None:
+                cost = 0.001  # Llama 3.1 is nearly free
+                # Call Replicate Llama 3.1 right away; the remaining setup
+                # below runs while the request is in flight
+                llm_task = asyncio.create_task(self._call_llm(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    style_keywords=style_keywords,
+                    temperature=0.0 if cache_mode else 0.7
+                ))
+
+            try:
+                logger.info(
+                    "[%s] Parsing prompt: '%s' for %s images",
+                    input.session_id, user_prompt, num_images
+                )
+                if llm_task is None:
+                    logger.info("[%s] Using cached LLM response", input.session_id)
+
+                # Generate consistency seed (same seed = similar visual style).
+                # Derived from the prompt so identical inputs stay cacheable
+                # downstream; pass options["nonce"] to get a fresh one.
+                consistency_seed = self._derive_seed(
+                    user_prompt, input.data.get("options", {}).get("nonce")
+                )
+            except BaseException:
+                # Don't leave the LLM call running unobserved
+                if llm_task is not None:
+                    llm_task.cancel()
+                raise
+
+            if llm_task is not None:
+                llm_response = await llm_task
 
             # Parse JSON response from LLM
             parsed_data = self._parse_llm_response(llm_response)
 
+            if cache_mode:
+                # Only cache responses that parsed and validated
+                _response_cache.put(cache_key, llm_response)
+
             # Add generation parameters to each prompt
+            generation_params = {"seed": consistency_seed, **_PROMPT_DEFAULTS}
             for prompt_obj in parsed_data["image_prompts"]:
-                prompt_obj["seed"] = consistency_seed
-                prompt_obj["guidance_scale"] = 7.5
-                prompt_obj["variation_strength"] = 0.3
+                prompt_obj.update(generation_params)
 
             duration = time.time() - start_time
 
             logger.info(
-                f"[{input.session_id}] Generated {len(parsed_data['image_prompts'])} prompts "
-                f"in {duration:.2f}s"
+                "[%s] Generated %d prompts in %.2fs",
+                input.session_id, len(parsed_data["image_prompts"]), duration
             )
 
             return AgentOutput(
@@ -107,93 +406,101 @@ class PromptParserAgent:
                     "product_category": parsed_data["product_category"],
                     "image_prompts": parsed_data["image_prompts"]
                 },
-                cost=0.001,  # Llama 3.1 is nearly free
+                cost=cost,
                 duration=duration,
                 error=None
             )
 
-        except Exception as e:
-            duration = time.time() - start_time
-            logger.error(f"[{input.session_id}] Prompt parsing failed: {e}")
+        except (ReplicateError, asyncio.TimeoutError) as e:
+            logger.error("[%s] Prompt parsing failed (LLM call): %s", input.session_id, e)
+            return self._failure(start_time, e)
 
-            return AgentOutput(
-                success=False,
-                data={},
-                cost=0.0,
-                duration=duration,
-                error=str(e)
-            )
+        except ValueError as e:
+            # Unparseable or invalid LLM response
+            logger.error("[%s] Prompt parsing failed (LLM response): %s", input.session_id, e)
+            return self._failure(start_time, e)
 
-    def _build_system_prompt(self, num_images: int) -> str:
+        except Exception as e:
+            logger.error("[%s] Prompt parsing failed: %s", input.session_id, e)
+            return self._failure(start_time, e)
+
+    @staticmethod
+    def _failure(start_time: float, error: BaseException) -> AgentOutput:
+        """Failed AgentOutput for an error raised during process()."""
+        return AgentOutput(
+            success=False,
+            data={},
+            cost=0.0,
+            duration=time.time() - start_time,
+            error=str(error)
+        )
+
+    async def process_batch(
+        self,
+        inputs: list[AgentInput],
+        max_concurrency: int = 10
+    ) -> list[AgentOutput]:
         """
-        Build the LLM system prompt for generating image prompts.
-        Supports both product photography and advertising narrative modes.
+        Process several independent prompts concurrently.
 
         Args:
-            num_images: Number of images to generate prompts for
+            inputs: AgentInputs as accepted by process()
+            max_concurrency: Maximum number of in-flight LLM calls
 
         Returns:
-            System prompt string
+            One AgentOutput per input, in input order
         """
-        return f"""You are an expert prompt engineer for AI advertising video generation.
-
-Your task: Extract subjects from the user's input and generate {num_images} varied image prompts.
-
-STEP 1: SUBJECT EXTRACTION
-Analyze the input and identify ALL subjects (people, objects, products, animals, etc.).
-
-Examples:
-- "man buys hat" → subjects: ["man", "hat"]
-- "woman drinks coffee" → subjects: ["woman", "coffee"]
-- "red sports car" → subjects: ["sports car"]
-- "dog plays with ball" → subjects: ["dog", "ball"]
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
-STEP 2: GENERATE VARIATIONS
-For each subject, generate multiple variations with different:
-- Poses/angles (front, side, 3/4 view, close-up)
-- Styles/types (if applicable)
-- Lighting/mood
-- Composition
+        async def run(agent_input: AgentInput) -> AgentOutput:
+            async with semaphore:
+                return await self.process(agent_input)
 
-Distribute {num_images} total prompts across all subjects.
-If 2 subjects: generate ~{num_images//2} variations of each
-If 1 subject: generate {num_images} variations of it
+        results = await asyncio.gather(
+            *(run(agent_input) for agent_input in inputs),
+            return_exceptions=True
+        )
 
-STEP 3: PROMPT STRUCTURE
-Each prompt should be detailed and specific:
-"[SHOT TYPE] professional photo of [SUBJECT with details], [POSE/ANGLE], [LIGHTING], [BACKGROUND], clean advertising photography, 8K, sharp focus"
+        outputs = []
+        for agent_input, result in zip(inputs, results):
+            if isinstance(result, BaseException):
+                logger.error("[%s] Prompt parsing failed: %s", agent_input.session_id, result)
+                result = AgentOutput(
+                    success=False,
+                    data={},
+                    cost=0.0,
+                    duration=0.0,
+                    error=str(result)
+                )
+            outputs.append(result)
+        return outputs
+
+    @staticmethod
+    def _derive_seed(user_prompt: str, nonce: Optional[object] = None) -> int:
+        """Deterministic 6-digit seed (100000-999999) for a prompt (+ nonce)."""
+        material = user_prompt if nonce is None else f"{user_prompt}|{nonce}"
+        digest = hashlib.blake2b(material.encode("utf-8"), digest_size=4).digest()
+        return 100000 + int.from_bytes(digest, "big") % 900000
 
-Examples:
-- "Medium shot professional photo of businessman in navy suit, front view facing camera with confident smile, soft studio lighting, white background, clean advertising photography, 8K, sharp focus"
-- "Close-up professional photo of brown fedora hat, side angle showing brim detail, dramatic side lighting, neutral gray background, clean advertising photography, 8K, sharp focus"
+    def _build_system_prompt(self, num_images: int) -> str:
+        """
+        Build the LLM system prompt for generating image prompts.
+        Supports both product photography and advertising narrative modes.
 
-STEP 4: OUTPUT FORMAT - Return ONLY valid JSON:
-{{
-    "subjects": ["subject1", "subject2", ...],
-    "style_keywords": ["advertising", "professional", "clean"],
-    "image_prompts": [
-        {{
-            "prompt": "[Detailed prompt]",
-            "negative_prompt": "blurry, low quality, distorted, amateur, watermark, text, multiple subjects",
-            "subject": "which subject this variation shows",
-            "variation_type": "front|side|close-up|3-4-view|detail"
-        }},
-        ... ({num_images} total)
-    ]
-}}
+        Args:
+            num_images: Number of images to generate prompts for
 
-CRITICAL RULES:
-- Each prompt generates ONE clear subject (not multiple subjects in same image)
-- Variations should be diverse (different angles, poses, styles)
-- Professional advertising quality
-- Clean, simple backgrounds (white, gray, or simple solid colors)
-- No text, watermarks, or clutter"""
+        Returns:
+            System prompt string
+        """
+        return _system_prompt(num_images, get_settings().PROMPT_PARSER_COMPACT_PROMPT)
 
     async def _call_llm(
         self,
         system_prompt: str,
         user_prompt: str,
-        style_keywords: list[str]
+        style_keywords: list[str],
+        temperature: float = 0.7
     ) -> str:
         """
         Call Replicate Llama 3.1 API.
@@ -202,6 +509,7 @@ CRITICAL RULES:
             system_prompt: System prompt with instructions
             user_prompt: User's product description
             style_keywords: Optional style hints from user
+            temperature: Sampling temperature
 
         Returns:
             LLM response as string
@@ -214,26 +522,48 @@ CRITICAL RULES:
         if style_keywords:
             user_message += f"\nStyle preferences: {', '.join(style_keywords)}"
 
-        logger.debug(f"Calling Replicate LLM: {self.model}")
-
-        # Call Replicate API
-        output = await self.client.async_run(
-            self.model,
-            input={
-                "system_prompt": system_prompt,
-                "prompt": user_message,
-                "max_tokens": 2000,
-                "temperature": 0.7,
-                "top_p": 0.9
-            }
+        llm_input = {
+            "system_prompt": system_prompt,
+            "prompt": user_message,
+            "max_tokens": 2000,
+            "temperature": temperature,
+            "top_p": 0.9
+        }
+
+        # Least-loaded healthy endpoint first; endpoints in cooldown last
+        candidates = sorted(
+            self.endpoints,
+            key=lambda e: (not e.healthy, e.outstanding, e.unhealthy_until)
         )
 
-        # Concatenate streaming output
-        full_response = "".join([chunk for chunk in output])
-
-        logger.debug(f"LLM response length: {len(full_response)} chars")
-
-        return full_response
+        last_error: Optional[Exception] = None
+        for endpoint in candidates:
+            logger.debug("Calling Replicate LLM: %s via %s", self.model, endpoint.name)
+
+            endpoint.outstanding += 1
+            try:
+                async with endpoint.semaphore, asyncio.timeout(self.timeout_s):
+                    # Stream the output, cancelling the prediction as soon as
+                    # the JSON object closes so trailing tokens aren't generated
+                    full_response = await stream_json_prediction(
+                        endpoint.client,
+                        endpoint.api_token,
+                        self.model,
+                        input=llm_input
+                    )
+            except Exception as e:
+                endpoint.mark_unhealthy()
+                last_error = e
+                logger.warning("Replicate endpoint %s failed: %s", endpoint.name, e)
+                continue
+            finally:
+                endpoint.outstanding -= 1
+
+            logger.debug("LLM response length: %d chars", len(full_response))
+
+            return full_response
+
+        raise last_error
 
     def _parse_llm_response(self, response: str) -> dict:
         """
@@ -249,24 +579,28 @@ CRITICAL RULES:
             ValueError: If response is invalid JSON or missing required fields
         """
         try:
-            # Try to extract JSON from response (LLM might add extra text)
-            response = response.strip()
-
-            # Find JSON object boundaries
+            # Try to extract JSON from response (LLM might add extra text):
+            # parse the first object and ignore anything after it
             start_idx = response.find("{")
-            end_idx = response.rfind("}") + 1
 
-            if start_idx == -1 or end_idx == 0:
+            if start_idx == -1:
                 raise ValueError("No JSON object found in response")
 
-            json_str = response[start_idx:end_idx]
-            parsed = json.loads(json_str)
-
-            # Validate required fields
-            required_fields = ["style_keywords", "image_prompts"]
-            for field in required_fields:
-                if field not in parsed:
-                    raise ValueError(f"Missing required field: {field}")
+            parsed = None
+            if orjson is not None:
+                try:
+                    parsed = orjson.loads(response[start_idx:])
+                except orjson.JSONDecodeError:
+                    pass  # e.g. trailing text after the object
+            if parsed is None:
+                parsed, _ = _DECODER.raw_decode(response, start_idx)
+
+            # Validate required fields and image_prompts structure in one
+            # compiled pydantic-core pass (the dict itself is kept as is)
+            try:
+                _PromptParserFields.model_validate(parsed)
+            except ValidationError as e:
+                raise ValueError(f"Invalid LLM response structure: {e}") from e
 
             # Add subjects if not present (backward compatibility)
             if "subjects" not in parsed:
@@ -276,18 +610,7 @@ CRITICAL RULES:
             if "product_category" not in parsed:
                 parsed["product_category"] = parsed.get("subjects", ["unknown"])[0] if parsed.get("subjects") else "unknown"
 
-            # Validate image_prompts structure
-            if not isinstance(parsed["image_prompts"], list):
-                raise ValueError("image_prompts must be a list")
-
-            for i, prompt_obj in enumerate(parsed["image_prompts"]):
-                required_prompt_fields = ["prompt", "negative_prompt"]
-                for field in required_prompt_fields:
-                    if field not in prompt_obj:
-                        raise ValueError(
-                            f"Missing field '{field}' in image_prompt {i}"
-                        )
-
+            for prompt_obj in parsed["image_prompts"]:
                 # Add view_type for backward compatibility if variation_type exists
                 if "variation_type" in prompt_obj and "view_type" not in prompt_obj:
                     prompt_obj["view_type"] = prompt_obj["variation_type"]
@@ -297,10 +620,10 @@ CRITICAL RULES:
             return parsed
 
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {e}")
-            logger.error(f"Response: {response[:500]}")
+            logger.error("Failed to parse LLM response as JSON: %s", e)
+            logger.error("Response: %s", response[:500])
             raise ValueError(f"Invalid JSON response from LLM: {e}")
 
         except Exception as e:
-            logger.error(f"Failed to validate LLM response: {e}")
+            logger.error("Failed to validate LLM response: %s", e)
             raise
@@ -7,20 +7,32 @@ using OpenRouter vision models.
 """
 import asyncio
 import base64
+import hashlib
+import itertools
 import json
 import logging
 import random
 import re
 import time
+from collections import Counter, OrderedDict
 from io import BytesIO
 from typing import Dict, List, Optional, Tuple, Any
 from PIL import Image
-import requests
+import httpx
 
 from app.agents.base import Agent, AgentInput, AgentOutput
+from app.config import get_settings
+from app.services import replicate_webhooks
+from app.services.http_client import get_api_http_client
+from app.services.progress_items import CumulativeItems
 from app.services.storage import StorageService
 from app.services.secrets import get_secret
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # API endpoints
@@ -45,13 +57,168 @@ COST_RATES = {
     "gpt-4o-mini-verification": 0.00015,
 }
 
+# Negative prompt sent with every generation
+NEGATIVE_PROMPT = (
+    "text, letters, words, typography, labels, captions, annotations, writing, "
+    "lettering, spelling, words on image, text overlay, watermark, signature, "
+    "inscription, script, font, typeface, characters, symbols as text, "
+    "alphanumeric, numbers as text, any readable text, any written text, "
+    "any printed text, any handwritten text, any visible text, text elements, "
+    "signs, banners, posters with text, labels on objects, text in image"
+)
+
+# Per-model input parameters; each call adds the prompt (and, for flux,
+# the style reference diagram)
+FLUX_SCHNELL_BASE_PARAMS = {
+    "negative_prompt": NEGATIVE_PROMPT,
+    "width": IMAGE_WIDTH,
+    "height": IMAGE_HEIGHT,
+    "output_format": "png",
+    "output_quality": 90,
+    "num_outputs": 1,
+    "num_inference_steps": 4
+}
+FLUX_DEV_BASE_PARAMS = {**FLUX_SCHNELL_BASE_PARAMS, "num_inference_steps": 28}
+SDXL_BASE_PARAMS = {
+    "negative_prompt": NEGATIVE_PROMPT,
+    "width": IMAGE_WIDTH,
+    "height": IMAGE_HEIGHT,
+    "num_outputs": 1,
+    "scheduler": "K_EULER",
+    "num_inference_steps": 20,
+    "guidance_scale": 7.5,
+    "output_format": "png"
+}
+
+# Model -> (base input parameters, cost per image, accepts a reference image)
+_MODEL_PROFILES = {
+    BASE_IMAGE_MODEL_FAST: (FLUX_SCHNELL_BASE_PARAMS, COST_RATES["flux-schnell"], True),
+    BASE_IMAGE_MODEL_QUALITY: (FLUX_DEV_BASE_PARAMS, COST_RATES["flux-dev"], True),
+    FALLBACK_IMAGE_MODEL: (SDXL_BASE_PARAMS, COST_RATES["sdxl"], False),
+}
+
+# Concurrent S3 uploads per agent run (each one occupies a worker thread)
+MAX_CONCURRENT_UPLOADS = 16
+
+# In-flight Replicate predictions per agent run; more only earns 429s
+MAX_CONCURRENT_PREDICTIONS = 8
+
+# Minimum seconds between cumulative status broadcasts
+STATUS_BROADCAST_INTERVAL = 0.2
+
+# Verification requests arriving within VERIFICATION_BATCH_WINDOW seconds
+# of each other share one vision call (up to VERIFICATION_BATCH_SIZE images)
+VERIFICATION_BATCH_SIZE = 4
+# Covers the decode/downscale spread of a released round (see
+# _VerificationRound); small next to a 1-3s vision call
+VERIFICATION_BATCH_WINDOW = 0.15
+
+# A segment's images wait (at most this many seconds) for the rest of the
+# segment to finish generating, so they reach the batcher together
+VERIFICATION_GATHER_TIMEOUT = 10.0
+
+VERIFICATION_PROMPT = """Analyze this image and respond with JSON only.
+
+Check:
+1. Does the image contain ANY text, labels, words, lettering, or readable characters? (has_text: true/false)
+2. Are there any watermarks, signatures, or annotations? (has_annotations: true/false)
+3. How confident are you? (confidence: 0.0-1.0)
+
+Respond ONLY with valid JSON in this exact format:
+{
+  "has_text": false,
+  "has_annotations": false,
+  "confidence": 0.95
+}"""
+
+BATCH_VERIFICATION_PROMPT = """Analyze each of the following images independently and respond with JSON only. Each image is preceded by its label ("Image 1:", "Image 2:", ...).
+
+Check, for each image:
+1. Does the image contain ANY text, labels, words, lettering, or readable characters? (has_text: true/false)
+2. Are there any watermarks, signatures, or annotations? (has_annotations: true/false)
+3. How confident are you? (confidence: 0.0-1.0)
+
+Respond ONLY with valid JSON in this exact format, one entry per image:
+{
+  "results": [
+    {"index": 1, "has_text": false, "has_annotations": false, "confidence": 0.95},
+    {"index": 2, "has_text": false, "has_annotations": false, "confidence": 0.95}
+  ]
+}"""
+
+
+def _prompt_part(text: str) -> Dict[str, Any]:
+    """
+    Leading text part of a verification message.
+
+    The prompt always comes first and is byte-identical, so providers with
+    automatic prefix caching (OpenAI) can reuse it; Anthropic models need
+    the explicit cache_control marker passed through by OpenRouter.
+    """
+    part = {"type": "text", "text": text}
+    if VERIFICATION_MODEL.startswith("anthropic/"):
+        part["cache_control"] = {"type": "ephemeral"}
+    return part
+
+
+_VERIFICATION_PROMPT_PART = _prompt_part(VERIFICATION_PROMPT)
+_BATCH_VERIFICATION_PROMPT_PART = _prompt_part(BATCH_VERIFICATION_PROMPT)
+
+# Verification images are downscaled to the vision model's working
+# resolution (short side 768px in high-detail mode) and sent as JPEG
+VERIFICATION_SHORT_SIDE = 768
+VERIFICATION_JPEG_QUALITY = 85
+
+# Verification verdicts by image content hash: (passed, result, error)
+_verification_cache: "OrderedDict[bytes, Tuple[bool, Dict, str]]" = OrderedDict()
+VERIFICATION_CACHE_MAX_ENTRIES = 2048
+
+# Verified images by request hash, shared across sessions. Objects expire
+# through the bucket lifecycle rule in infra/aws/s3-lifecycle-story-image-cache.json
+# (put-bucket-lifecycle-configuration replaces existing rules; merge first)
+IMAGE_CACHE_S3_PREFIX = "cache/story_images/"
+
+# Patterns used for filenames, segment headers and prompt cleanup
+_INVALID_CHARS_RE = re.compile(r'[<>:"/\\|?*\x00]')
+_UNDERSCORES_RE = re.compile(r'_+')
+_DIGITS_RE = re.compile(r'(\d+)')
+_WS_RE = re.compile(r'\s+')
+
+# Lowercase section markers inside a segment of segments.md
+_NARRATION_MARKER = "narration text"
+_VISUAL_GUIDANCE_MARKER = "visual guidance"
+
+# Visual theme keywords, in priority order: color, setting, style
+_THEME_KEYWORD_GROUPS = (
+    ("blue", "green", "red", "warm", "cool", "vibrant", "bright", "dark", "light"),
+    ("outdoor", "indoor", "nature", "laboratory", "classroom", "space", "ocean", "forest", "urban", "microscopic", "cosmic"),
+    ("realistic", "illustrated", "animated", "photographic", "artistic", "diagram", "3d"),
+)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Per-position styling for the four narrative segments
+_SEGMENT_STYLING = {
+    1: "Hook segment: Bold, attention-grabbing visuals with high energy. ",
+    2: "Concept segment: Clear, explanatory visuals that build on the hook. ",
+    3: "Process segment: Detailed, step-by-step visual progression. ",
+    4: "Conclusion segment: Cohesive summary visuals that tie everything together. ",
+}
+
+# Appended to every story image prompt
+_NO_LABELS = "NO TEXT, NO LABELS, NO WORDS, NO LETTERING, NO TYPography, NO WRITING, NO ANNOTATIONS, NO CAPTIONS, NO WATERMARKS, NO SIGNATURES. Pure visual storytelling only. Absolutely no text elements whatsoever."
+
+# Text-related terms scrubbed from visual guidance before prompting
+_TEXT_TERMS_RE = re.compile(
+    r'\b(?:text overlay|labels?|captions?|annotations?|writing|lettering|text)\b',
+    re.IGNORECASE
+)
+
 
 def sanitize_filename(name: str) -> str:
     """Sanitize a string to be filesystem-safe."""
-    invalid_chars = r'[<>:"/\\|?*\x00]'
-    sanitized = re.sub(invalid_chars, '_', name)
+    sanitized = _INVALID_CHARS_RE.sub('_', name)
     sanitized = sanitized.strip(' .')
-    sanitized = re.sub(r'_+', '_', sanitized)
+    sanitized = _UNDERSCORES_RE.sub('_', sanitized)
     if not sanitized:
         sanitized = "unnamed"
     return sanitized
@@ -83,12 +250,14 @@ def parse_segments_md(content: str) -> Tuple[Optional[str], List[Dict]]:
     current_segment = None
     in_narration = False
     narration_lines = []
+    guidance_parts = []  # Joined once when the segment is complete
     
-    for i, line in enumerate(lines):
+    for line in lines:
         if line.startswith("**Segment") and ":" in line:
             if current_segment:
                 if narration_lines:
                     current_segment["narrationtext"] = "\n".join(narration_lines).strip().strip('"').strip()
+                current_segment["visual_guidance_preview"] = " ".join(guidance_parts)
                 segments.append(current_segment)
             
             segment_match = line.replace("**", "").strip()
@@ -101,7 +270,7 @@ def parse_segments_md(content: str) -> Tuple[Optional[str], List[Dict]]:
                 duration = 0
                 if "(" in line and ")" in line:
                     duration_part = line[line.find("(")+1:line.find(")")]
-                    numbers = re.findall(r'(\d+)', duration_part)
+                    numbers = _DIGITS_RE.findall(duration_part)
                     if len(numbers) >= 2:
                         start_time = int(numbers[0])
                         end_time = int(numbers[1])
@@ -119,12 +288,15 @@ def parse_segments_md(content: str) -> Tuple[Optional[str], List[Dict]]:
                     "visual_guidance_preview": ""
                 }
                 narration_lines = []
+                guidance_parts = []
                 in_narration = False
         elif current_segment:
-            if "Narration text" in line or "narration text" in line.lower():
+            # Lowercase once per line for the case-insensitive marker checks
+            lowered = line.lower()
+            if _NARRATION_MARKER in lowered:
                 in_narration = True
                 continue
-            elif line.strip().startswith("```"):
+            elif line.lstrip().startswith("```"):
                 if in_narration and not narration_lines:
                     continue
                 elif in_narration and narration_lines:
@@ -134,17 +306,17 @@ def parse_segments_md(content: str) -> Tuple[Optional[str], List[Dict]]:
                     continue
             elif in_narration:
                 narration_lines.append(line)
-            elif "Visual guidance" in line or "visual guidance" in line.lower():
+            elif _VISUAL_GUIDANCE_MARKER in lowered:
                 if ":" in line:
                     guidance = line.split(":", 1)[1].strip().strip('"').strip()
-                    if current_segment["visual_guidance_preview"]:
-                        current_segment["visual_guidance_preview"] += " " + guidance
-                    else:
-                        current_segment["visual_guidance_preview"] = guidance
+                    # Empty lines before the first guidance text are dropped
+                    if guidance or guidance_parts:
+                        guidance_parts.append(guidance)
     
     if current_segment:
         if narration_lines:
             current_segment["narrationtext"] = "\n".join(narration_lines).strip().strip('"').strip()
+        current_segment["visual_guidance_preview"] = " ".join(guidance_parts)
         segments.append(current_segment)
     
     if not segments:
@@ -153,9 +325,9 @@ def parse_segments_md(content: str) -> Tuple[Optional[str], List[Dict]]:
     
     # Check for duplicate segment numbers
     segment_numbers = [s["number"] for s in segments]
-    duplicates = [num for num in segment_numbers if segment_numbers.count(num) > 1]
+    duplicates = [num for num, count in Counter(segment_numbers).items() if count > 1]
     if duplicates:
-        logger.error(f"Duplicate segment numbers found: {sorted(set(duplicates))}")
+        logger.error(f"Duplicate segment numbers found: {sorted(duplicates)}")
         return None, []
     
     # Validate all segments have required data
@@ -172,6 +344,185 @@ def parse_segments_md(content: str) -> Tuple[Optional[str], List[Dict]]:
     return template_title, segments
 
 
+def _image_cache_key(prompt: str, fast_mode: bool, diagram_bytes: Optional[bytes]) -> str:
+    """S3 key of the cached verified image for an exact generation request."""
+    digest = hashlib.sha256()
+    digest.update(prompt.encode("utf-8"))
+    digest.update(b"|fast" if fast_mode else b"|quality")
+    if diagram_bytes:
+        digest.update(b"|")
+        digest.update(hashlib.blake2b(diagram_bytes).digest())
+    return f"{IMAGE_CACHE_S3_PREFIX}{digest.hexdigest()}.png"
+
+
+def _backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Jittered exponential backoff: base * 2**attempt, capped, scaled by 0.5-1.5."""
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _json_body(payload: Any) -> bytes:
+    """Serialize an API request body (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
+
+def _json_loads(data: Any) -> Any:
+    """
+    Parse an API response body or JSON string (orjson when available).
+
+    Both parsers raise a json.JSONDecodeError (a ValueError) on bad input.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _data_url(mime: str, data) -> str:
+    """base64 data URL, assembled as bytes and decoded in a single copy."""
+    return (f"data:{mime};base64,".encode("ascii") + base64.b64encode(data)).decode("ascii")
+
+
+def _encode_for_verification(image_bytes: bytes) -> str:
+    """
+    Downscale and JPEG-encode an image for the vision model.
+
+    Returns:
+        base64 data URL, built once so retries and batches reuse the same
+        string; the original PNG if it can't be decoded
+    """
+    try:
+        with Image.open(BytesIO(image_bytes)) as img:
+            img = img.convert("RGB")
+            scale = VERIFICATION_SHORT_SIDE / min(img.size)
+            if scale < 1:
+                img = img.resize(
+                    (round(img.width * scale), round(img.height * scale)),
+                    Image.LANCZOS
+                )
+            buffer = BytesIO()
+            img.save(buffer, format="JPEG", quality=VERIFICATION_JPEG_QUALITY)
+        return _data_url("image/jpeg", buffer.getbuffer())
+    except Exception as e:
+        logger.warning(f"Could not re-encode image for verification, sending PNG: {e}")
+        return _data_url("image/png", image_bytes)
+
+
+
+class _VerificationBatcher:
+    """
+    Coalesces concurrent verification requests into multi-image calls.
+
+    Requests arriving within VERIFICATION_BATCH_WINDOW of the first pending
+    one are sent together, up to VERIFICATION_BATCH_SIZE per call; a lone
+    request goes out as a normal single-image call. Each caller gets back
+    its own (status, verdict, error text, batch size) or the exception the
+    call raised.
+    """
+
+    def __init__(
+        self,
+        send,
+        max_batch: int = VERIFICATION_BATCH_SIZE,
+        window: float = VERIFICATION_BATCH_WINDOW
+    ):
+        self._send = send
+        self._max_batch = max_batch
+        self._window = window
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: set = set()  # Strong refs to running batch tasks
+
+    async def verify(self, data_url: str) -> Tuple[int, Optional[Dict], str, int]:
+        """Queue one image for the next batch and wait for its verdict."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((data_url, future))
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Send the pending requests (at most max_batch per call)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self._max_batch]
+            del self._pending[:self._max_batch]
+            task = asyncio.create_task(self._run(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Skip callers that gave up (cancelled) before the call went out
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+        try:
+            outcomes = await self._send([data_url for data_url, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), outcome in zip(batch, outcomes):
+            if not future.done():
+                future.set_result(outcome)
+
+
+class _VerificationRound:
+    """
+    Gathers one segment's verification requests into rounds.
+
+    Images finish generating on their own polling schedules, seconds apart,
+    so left alone each would reach the batcher by itself. An image ready to
+    verify waits in gather() until every image of the segment still in play
+    is ready too (or VERIFICATION_GATHER_TIMEOUT passes); the round is then
+    released at once and goes out as multi-image calls. Images that are done
+    (verified, cached or given up) call leave() so nobody waits on them.
+    """
+
+    def __init__(self, images: int):
+        self._active = images
+        self._arrived = 0
+        self._released = asyncio.Event()
+
+    async def gather(self) -> None:
+        """Wait until the rest of the segment is ready to verify."""
+        released = self._released
+        self._arrived += 1
+        self._check()
+        if released.is_set():
+            return
+        try:
+            await asyncio.wait_for(released.wait(), VERIFICATION_GATHER_TIMEOUT)
+        except asyncio.TimeoutError:
+            # A straggler is still generating; verify the ones that are ready
+            if released is self._released:
+                self._release()
+
+    def leave(self) -> None:
+        """An image is finished and will not verify again."""
+        self._active -= 1
+        self._check()
+
+    def _check(self) -> None:
+        if self._arrived and self._arrived >= self._active:
+            self._release()
+
+    def _release(self) -> None:
+        self._released.set()
+        self._released = asyncio.Event()
+        self._arrived = 0
+
+
 def generate_story_prompts(
     segment_data: Dict,
     num_images: int,
@@ -198,10 +549,8 @@ def generate_story_prompts(
     visual_guidance = segment_data.get("visual_guidance_preview", "")
 
     # Remove text-related terms from visual guidance
-    text_terms = ["text overlay", "text", "labels", "caption", "annotation", "writing", "lettering"]
-    for term in text_terms:
-        visual_guidance = visual_guidance.replace(term, "").replace(term.title(), "").replace(term.upper(), "")
-    visual_guidance = " ".join(visual_guidance.split())
+    visual_guidance = _TEXT_TERMS_RE.sub("", visual_guidance)
+    visual_guidance = _WS_RE.sub(" ", visual_guidance).strip()
 
     # Build style base with continuity
     style_base = "Educational storytelling style, cinematic 16:9 composition"
@@ -214,51 +563,33 @@ def generate_story_prompts(
         continuity_instruction = f"Visual continuity from previous scene: {previous_segment_context}. Maintain consistent visual style, lighting, and color palette. "
 
     # Add segment-specific styling based on position in narrative
-    segment_styling = ""
-    if segment_number == 1:
-        segment_styling = "Hook segment: Bold, attention-grabbing visuals with high energy. "
-    elif segment_number == 2:
-        segment_styling = "Concept segment: Clear, explanatory visuals that build on the hook. "
-    elif segment_number == 3:
-        segment_styling = "Process segment: Detailed, step-by-step visual progression. "
-    elif segment_number == 4:
-        segment_styling = "Conclusion segment: Cohesive summary visuals that tie everything together. "
-
-    no_labels = "NO TEXT, NO LABELS, NO WORDS, NO LETTERING, NO TYPography, NO WRITING, NO ANNOTATIONS, NO CAPTIONS, NO WATERMARKS, NO SIGNATURES. Pure visual storytelling only. Absolutely no text elements whatsoever."
+    segment_styling = _SEGMENT_STYLING.get(segment_number, "")
+
+    # Shared pieces, built once; each frame only adds its shot and beat
+    opening = f"{segment_styling}{continuity_instruction}{visual_guidance}. "
+    story = f"{continuity_instruction}{narration}. "
+
+    def frame(shot: str, body: str, beat: str) -> str:
+        return f"{style_base}{shot}. {body}{beat} {_NO_LABELS}"
 
     prompts = []
 
     if num_images == 1:
-        prompt = f"{style_base}. {segment_styling}{continuity_instruction}{visual_guidance}. {narration}. Visual storytelling moment that answers the question."
-        prompts.append(f"{prompt} {no_labels}")
+        prompts.append(frame("", opening, f"{narration}. Visual storytelling moment that answers the question."))
     elif num_images == 2:
-        prompts.append(
-            f"{style_base}, establishing shot. {segment_styling}{continuity_instruction}{visual_guidance}. "
-            f"Opening moment: The question is posed visually. {no_labels}"
-        )
-        prompts.append(
-            f"{style_base}, main scene. {continuity_instruction}{narration}. "
-            f"Answering moment: Visual answer to the question, clear narrative progression. {no_labels}"
-        )
+        prompts.append(frame(", establishing shot", opening, "Opening moment: The question is posed visually."))
+        prompts.append(frame(", main scene", story, "Answering moment: Visual answer to the question, clear narrative progression."))
     elif num_images >= 3:
-        prompts.append(
-            f"{style_base}, establishing shot. {segment_styling}{continuity_instruction}{visual_guidance}. "
-            f"Frame 1: Opening moment - The question is posed visually, curious and engaging. {no_labels}"
-        )
-        prompts.append(
-            f"{style_base}, middle scene. {continuity_instruction}{narration}. "
-            f"Frame 2: Discovery moment - Visual progression toward the answer, engaging narrative. {no_labels}"
-        )
-        prompts.append(
-            f"{style_base}, conclusion scene. {continuity_instruction}{narration}. "
-            f"Frame 3: Answer moment - Visual conclusion that answers the question, satisfying narrative resolution. {no_labels}"
-        )
+        prompts.append(frame(", establishing shot", opening, "Frame 1: Opening moment - The question is posed visually, curious and engaging."))
+        prompts.append(frame(", middle scene", story, "Frame 2: Discovery moment - Visual progression toward the answer, engaging narrative."))
+        prompts.append(frame(", conclusion scene", story, "Frame 3: Answer moment - Visual conclusion that answers the question, satisfying narrative resolution."))
         for i in range(3, num_images):
             frame_num = i + 1
-            prompts.append(
-                f"{style_base}, scene {frame_num}. {continuity_instruction}{narration}. "
-                f"Frame {frame_num}: Continued visual progression, maintaining narrative flow and style consistency. {no_labels}"
-            )
+            prompts.append(frame(
+                f", scene {frame_num}",
+                story,
+                f"Frame {frame_num}: Continued visual progression, maintaining narrative flow and style consistency."
+            ))
 
     return prompts
 
@@ -290,7 +621,22 @@ class StoryImageGeneratorAgent:
         self.storage_service = storage_service
         self.openrouter_api_key = openrouter_api_key
         self.replicate_api_key = replicate_api_key
+        self._replicate_headers = {
+            "Authorization": f"Token {replicate_api_key}",
+            "Content-Type": "application/json"
+        }
         self.websocket_manager = websocket_manager
+        # Pooled keepalive connections shared with other agents
+        self.http_client = get_api_http_client()
+        self._upload_semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+        self._replicate_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PREDICTIONS)
+        self._verification_batcher = _VerificationBatcher(self._post_verification)
+        # Uncached verifications in flight by content hash, joined by
+        # duplicates, and how many callers are waiting on each
+        self._verifications_in_flight: Dict[bytes, asyncio.Task] = {}
+        self._verification_waiters: Dict[bytes, int] = {}
+        # Set per run in process() when cumulative status is broadcast
+        self._status_changed: Optional[asyncio.Event] = None
     
     async def process(self, input: AgentInput) -> AgentOutput:
         """
@@ -304,6 +650,9 @@ class StoryImageGeneratorAgent:
         - max_passes: Maximum regeneration attempts per image
         - max_verification_passes: Maximum verification attempts per image
         - fast_mode: Use fast/cheap model if True
+        - use_image_cache: Reuse verified images from earlier identical
+          requests instead of regenerating (default:
+          settings.STORY_IMAGE_CACHE, off unless configured)
         
         Returns:
             AgentOutput with results, cost, and duration
@@ -322,6 +671,7 @@ class StoryImageGeneratorAgent:
             fast_mode = data.get("fast_mode", False)
             template_title = data.get("template_title", "Untitled")
             cumulative_items = data.get("cumulative_items", [])
+            use_image_cache = data.get("use_image_cache", get_settings().STORY_IMAGE_CACHE)
 
             if not segments:
                 return AgentOutput(
@@ -332,11 +682,26 @@ class StoryImageGeneratorAgent:
                     error="No segments provided"
                 )
 
-            # Download diagram if provided
-            diagram_bytes = None
+            # Start the diagram download (if provided) in a worker thread so
+            # the S3 round trip overlaps the setup below
+            diagram_task = None
             if diagram_s3_path:
+                diagram_task = asyncio.create_task(asyncio.to_thread(
+                    self.storage_service.read_file, diagram_s3_path
+                ))
+
+            try:
+                # Extract visual themes for continuity across all segments
+                visual_theme = self._extract_visual_theme(segments, template_title)
+            except BaseException:
+                if diagram_task is not None:
+                    diagram_task.cancel()
+                raise
+
+            diagram_bytes = None
+            if diagram_task is not None:
                 try:
-                    diagram_bytes = self.storage_service.read_file(diagram_s3_path)
+                    diagram_bytes = await diagram_task
                     logger.info(f"Downloaded diagram from S3: {diagram_s3_path}")
                 except Exception as e:
                     logger.warning(f"Failed to download diagram: {e}, continuing without style reference")
@@ -344,39 +709,75 @@ class StoryImageGeneratorAgent:
             # Create a lock for thread-safe cumulative_items updates
             items_lock = asyncio.Lock()
 
-            # Extract visual themes for continuity across all segments
-            visual_theme = self._extract_visual_theme(segments, template_title)
+            # Coalesce cumulative status broadcasts in a background task
+            status_task = None
+            if cumulative_items and self.websocket_manager:
+                if not isinstance(cumulative_items, CumulativeItems):
+                    cumulative_items = CumulativeItems(cumulative_items)
+                self._status_changed = asyncio.Event()
+                status_task = asyncio.create_task(
+                    self._broadcast_cumulative_status(
+                        input.session_id, cumulative_items, items_lock
+                    )
+                )
 
             # Process segments in parallel with shared visual theme
             total_segments = len(segments)
-            segment_tasks = [
-                self._process_segment(
-                    segment,
-                    template_title,
-                    diagram_bytes,
-                    output_s3_prefix,
-                    num_images,
-                    max_passes,
-                    max_verification_passes,
-                    fast_mode,
-                    input.session_id,
-                    total_segments,
-                    cumulative_items,
-                    items_lock,
-                    visual_theme
-                )
-                for segment in segments
-            ]
 
-            segment_results = await asyncio.gather(*segment_tasks, return_exceptions=True)
+            async def run_segment(segment: Dict) -> Tuple[Dict, Any]:
+                try:
+                    return segment, await self._process_segment(
+                        segment,
+                        template_title,
+                        diagram_bytes,
+                        output_s3_prefix,
+                        num_images,
+                        max_passes,
+                        max_verification_passes,
+                        fast_mode,
+                        input.session_id,
+                        total_segments,
+                        cumulative_items,
+                        items_lock,
+                        visual_theme,
+                        use_image_cache
+                    )
+                except Exception as e:
+                    return segment, e
+
+            segment_tasks = [asyncio.create_task(run_segment(segment)) for segment in segments]
+
+            # Collect segments as they finish so progress is reported
+            # without waiting on the slowest one
+            segment_results = []
+            try:
+                for next_done in asyncio.as_completed(segment_tasks):
+                    segment, result = await next_done
+                    segment_results.append((segment, result))
+
+                    if self.websocket_manager and not cumulative_items:
+                        done = len(segment_results)
+                        await self.websocket_manager.broadcast_status(
+                            input.session_id,
+                            status="generating_images",
+                            progress=10 + int(40 * done / total_segments),
+                            details=f"Finished segment {segment['number']}: {segment['title']} ({done} of {total_segments} segments done)"
+                        )
+            finally:
+                # No-op for finished tasks; stops stragglers if we were cancelled
+                for task in segment_tasks:
+                    task.cancel()
+                if status_task is not None:
+                    await self._stop_status_broadcaster(
+                        status_task, input.session_id, cumulative_items, items_lock
+                    )
             
             # Process results
             successful_segments = []
             failed_segments = []
             total_images_generated = 0
             
-            for i, result in enumerate(segment_results):
-                segment = segments[i]
+            for segment, result in segment_results:
                 if isinstance(result, Exception):
                     logger.error(f"Segment {segment['number']} failed with exception: {result}")
                     failed_segments.append({
@@ -396,8 +797,9 @@ class StoryImageGeneratorAgent:
                             "error": result.get("error", "Unknown error")
                         })
             
-            # Sort successful segments by number
+            # Sort by number (results arrive in completion order)
             successful_segments.sort(key=lambda x: x.get("segment_number", 0))
+            failed_segments.sort(key=lambda x: x["segment_number"])
             
             duration = time.time() - start_time
             
@@ -443,29 +845,15 @@ class StoryImageGeneratorAgent:
             seg.get("visual_guidance_preview", "") for seg in segments
         ])
 
-        # Extract key visual elements (simplified - could be enhanced with NLP)
+        # Extract key visual elements (simplified - could be enhanced with NLP).
+        # Lowercase and tokenize once; each group contributes its first
+        # keyword (in priority order) that appears as a word.
+        tokens = set(_WORD_RE.findall(all_visual_guidance.lower()))
         common_elements = []
-
-        # Color-related keywords
-        color_keywords = ["blue", "green", "red", "warm", "cool", "vibrant", "bright", "dark", "light"]
-        for keyword in color_keywords:
-            if keyword in all_visual_guidance.lower():
-                common_elements.append(keyword)
-                break  # Take first color theme found
-
-        # Setting/environment keywords
-        setting_keywords = ["outdoor", "indoor", "nature", "laboratory", "classroom", "space", "ocean", "forest", "urban", "microscopic", "cosmic"]
-        for keyword in setting_keywords:
-            if keyword in all_visual_guidance.lower():
+        for keywords in _THEME_KEYWORD_GROUPS:
+            keyword = next((k for k in keywords if k in tokens), None)
+            if keyword is not None:
                 common_elements.append(keyword)
-                break
-
-        # Style keywords
-        style_keywords = ["realistic", "illustrated", "animated", "photographic", "artistic", "diagram", "3D"]
-        for keyword in style_keywords:
-            if keyword in all_visual_guidance.lower():
-                common_elements.append(keyword)
-                break
 
         # Build theme description
         if common_elements:
@@ -481,40 +869,71 @@ class StoryImageGeneratorAgent:
     async def _update_cumulative_status(
         self,
         session_id: str,
-        cumulative_items: list,
+        cumulative_items: CumulativeItems,
         items_lock: asyncio.Lock,
         item_id: str,
         new_status: str
     ):
-        """Update a single item's status and broadcast the full cumulative state."""
+        """Update a single item's status; the broadcaster task sends it out."""
         if not cumulative_items or not items_lock or not self.websocket_manager:
             return
 
         async with items_lock:
-            # Find and update the item
-            for item in cumulative_items:
-                if item["id"] == item_id:
-                    item["status"] = new_status
-                    break
+            cumulative_items.set_status(item_id, new_status)
 
-            # Count completed items for progress calculation
-            completed_count = sum(1 for item in cumulative_items if item["status"] == "completed")
-            total_count = len(cumulative_items)
-            progress = int((completed_count / total_count) * 100) if total_count > 0 else 0
+        if self._status_changed is not None:
+            self._status_changed.set()
 
-            # Generate details message
-            processing_items = [item for item in cumulative_items if item["status"] == "processing"]
-            if processing_items:
-                details = f"Processing: {processing_items[0]['name']}"
-            else:
-                details = f"Completed {completed_count} of {total_count} items"
+    async def _broadcast_cumulative_status(
+        self,
+        session_id: str,
+        cumulative_items: CumulativeItems,
+        items_lock: asyncio.Lock
+    ):
+        """
+        Broadcast the full cumulative state whenever it changed, at most
+        once per STATUS_BROADCAST_INTERVAL, so a burst of image status flips
+        goes out as one message. Runs until cancelled.
+        """
+        while True:
+            await self._status_changed.wait()
+            self._status_changed.clear()
+            await self._send_cumulative_status(session_id, cumulative_items, items_lock)
+            await asyncio.sleep(STATUS_BROADCAST_INTERVAL)
 
+    async def _stop_status_broadcaster(
+        self,
+        status_task: asyncio.Task,
+        session_id: str,
+        cumulative_items: CumulativeItems,
+        items_lock: asyncio.Lock
+    ):
+        """Stop the broadcaster and flush the final state."""
+        status_task.cancel()
+        try:
+            await status_task
+        except asyncio.CancelledError:
+            pass
+
+        try:
+            await self._send_cumulative_status(session_id, cumulative_items, items_lock)
+        except Exception as e:
+            logger.warning(f"Failed to broadcast final image status: {e}")
+
+    async def _send_cumulative_status(
+        self,
+        session_id: str,
+        cumulative_items: CumulativeItems,
+        items_lock: asyncio.Lock
+    ):
+        """Broadcast the cumulative state (progress counters are O(1))."""
+        async with items_lock:
             # Broadcast the full cumulative state
             await self.websocket_manager.broadcast_status(
                 session_id,
                 status="generating_images_audio",
-                progress=progress,
-                details=details,
+                progress=cumulative_items.progress,
+                details=cumulative_items.details,
                 items=cumulative_items
             )
 
@@ -533,12 +952,20 @@ class StoryImageGeneratorAgent:
         diagram_bytes: Optional[bytes],
         session_id: str,
         cumulative_items: list = None,
-        items_lock: asyncio.Lock = None
+        items_lock: asyncio.Lock = None,
+        use_image_cache: bool = False,
+        verification_round: Optional[_VerificationRound] = None
     ) -> Dict:
-        """Generate a single image with retry logic."""
+        """
+        Generate a single image with retry logic.
+
+        With a verification_round, each verification waits for the rest of
+        the segment's images so they are verified together.
+        """
         total_cost = 0.0
         success = False
         gen_attempt = 0
+        s3_key = f"{output_s3_prefix}{template_title}/{segment_num}. {segment_title}/generated_images/image_{image_num}.png"
 
         # Update cumulative status: mark image as processing
         item_id = f"image_seg{segment_num}_img{image_num}"
@@ -551,6 +978,14 @@ class StoryImageGeneratorAgent:
                 "processing"
             )
 
+        # Reuse a previously verified image for the exact same request
+        cache_key = _image_cache_key(prompt, fast_mode, diagram_bytes) if use_image_cache else None
+        if cache_key and await self._restore_cached_image(cache_key, s3_key):
+            logger.info(f"Segment {segment_num}, Image {image_num}: Reused cached image")
+            gen_metadata_serializable = {"cache_hit": True, "cost": 0.0, "time_seconds": 0.0}
+            verify_metadata_serializable = {"cached": True, "cost": 0.0, "attempts_made": 0}
+            success = True
+
         while not success and gen_attempt < max_passes:
             gen_attempt += 1
 
@@ -565,7 +1000,7 @@ class StoryImageGeneratorAgent:
             if not gen_success:
                 total_cost += gen_metadata.get("cost", 0.0)
                 if gen_attempt < max_passes:
-                    await asyncio.sleep(2)  # Brief delay before retry
+                    await asyncio.sleep(_backoff_delay(gen_attempt - 1))
                     continue
                 break
 
@@ -575,7 +1010,9 @@ class StoryImageGeneratorAgent:
 
             total_cost += gen_metadata.get("cost", 0.0)
 
-            # Verify image
+            # Verify image (together with the segment's other images)
+            if verification_round is not None:
+                await verification_round.gather()
             verify_success, verify_result, verify_error, verify_metadata = await self._verify_image_no_labels(
                 image_bytes,
                 max_verification_passes
@@ -585,52 +1022,55 @@ class StoryImageGeneratorAgent:
 
             if verify_success:
                 # Upload to S3
-                s3_key = f"{output_s3_prefix}{template_title}/{segment_num}. {segment_title}/generated_images/image_{image_num}.png"
-                self.storage_service.upload_file_direct(
-                    image_bytes,
-                    s3_key,
-                    content_type="image/png"
-                )
+                async with self._upload_semaphore:
+                    await self.storage_service.put_bytes_async(
+                        s3_key,
+                        image_bytes,
+                        content_type="image/png"
+                    )
+                if cache_key:
+                    await self._store_cached_image(s3_key, cache_key)
 
                 # Remove image_bytes from metadata before serialization
                 gen_metadata_serializable = {k: v for k, v in gen_metadata.items() if k != "image_bytes"}
                 verify_metadata_serializable = {k: v for k, v in verify_metadata.items() if k != "image_bytes"}
 
-                # Update cumulative status: mark image as completed
-                if cumulative_items and items_lock:
-                    await self._update_cumulative_status(
-                        session_id,
-                        cumulative_items,
-                        items_lock,
-                        item_id,
-                        "completed"
-                    )
-
                 success = True
-
-                # Send WebSocket update for each image generated
-                if self.websocket_manager:
-                    await self.websocket_manager.broadcast_status(
-                        session_id,
-                        status="image_generated",
-                        progress=10 + (segment_num - 1) * 10 + (image_num * 2),
-                        details=f"Generated image {image_num} of {num_images} for segment {segment_num}: {segment_title}"
-                    )
-
-                return {
-                    "success": True,
-                    "cost": total_cost,
-                    "image_data": {
-                        "image_number": image_num,
-                        "s3_key": s3_key,
-                        "generation_metadata": gen_metadata_serializable,
-                        "verification_metadata": verify_metadata_serializable
-                    }
-                }
             else:
                 if gen_attempt < max_passes:
                     logger.warning(f"Segment {segment_num}, Image {image_num}: Verification failed, regenerating...")
-                    await asyncio.sleep(1)
+                    await asyncio.sleep(_backoff_delay(gen_attempt - 1))
+
+        if success:
+            # Update cumulative status: mark image as completed
+            if cumulative_items and items_lock:
+                await self._update_cumulative_status(
+                    session_id,
+                    cumulative_items,
+                    items_lock,
+                    item_id,
+                    "completed"
+                )
+
+            # Send WebSocket update for each image generated
+            if self.websocket_manager:
+                await self.websocket_manager.broadcast_status(
+                    session_id,
+                    status="image_generated",
+                    progress=10 + (segment_num - 1) * 10 + (image_num * 2),
+                    details=f"Generated image {image_num} of {num_images} for segment {segment_num}: {segment_title}"
+                )
+
+            return {
+                "success": True,
+                "cost": total_cost,
+                "image_data": {
+                    "image_number": image_num,
+                    "s3_key": s3_key,
+                    "generation_metadata": gen_metadata_serializable,
+                    "verification_metadata": verify_metadata_serializable
+                }
+            }
 
         # Failed after all attempts
         logger.error(f"Segment {segment_num}, Image {image_num}: Failed after {max_passes} attempts")
@@ -640,6 +1080,26 @@ class StoryImageGeneratorAgent:
             "error": f"Failed after {max_passes} attempts"
         }
 
+    async def _restore_cached_image(self, cache_key: str, s3_key: str) -> bool:
+        """Copy the cached image for cache_key to s3_key; False on a miss."""
+        try:
+            async with self._upload_semaphore:
+                if not await asyncio.to_thread(self.storage_service.file_exists, cache_key):
+                    return False
+                await asyncio.to_thread(self.storage_service.copy_file, cache_key, s3_key)
+            return True
+        except Exception as e:
+            logger.warning(f"Image cache lookup failed for {cache_key}: {e}")
+            return False
+
+    async def _store_cached_image(self, s3_key: str, cache_key: str) -> None:
+        """Record a verified image under its cache key (server-side copy)."""
+        try:
+            async with self._upload_semaphore:
+                await asyncio.to_thread(self.storage_service.copy_file, s3_key, cache_key)
+        except Exception as e:
+            logger.warning(f"Failed to cache image {s3_key}: {e}")
+
     async def _process_segment(
         self,
         segment: Dict,
@@ -654,7 +1114,8 @@ class StoryImageGeneratorAgent:
         total_segments: int,
         cumulative_items: list = None,
         items_lock: asyncio.Lock = None,
-        visual_theme: str = ""
+        visual_theme: str = "",
+        use_image_cache: bool = False
     ) -> Dict:
         """Process a single segment and generate images."""
         segment_start_time = time.time()
@@ -685,9 +1146,20 @@ class StoryImageGeneratorAgent:
             generated_images = []
             segment_cost = 0.0
 
+            # Verifications from this segment's images are released together
+            verification_round = _VerificationRound(len(prompts))
+
+            async def generate_image(**kwargs) -> Dict:
+                try:
+                    return await self._generate_single_image(
+                        verification_round=verification_round, **kwargs
+                    )
+                finally:
+                    verification_round.leave()
+
             # Create tasks for all images in this segment
             image_tasks = [
-                self._generate_single_image(
+                generate_image(
                     prompt=prompt,
                     image_num=img_idx + 1,
                     segment_num=segment_num,
@@ -701,7 +1173,8 @@ class StoryImageGeneratorAgent:
                     diagram_bytes=diagram_bytes,
                     session_id=session_id,
                     cumulative_items=cumulative_items,
-                    items_lock=items_lock
+                    items_lock=items_lock,
+                    use_image_cache=use_image_cache
                 )
                 for img_idx, prompt in enumerate(prompts)
             ]
@@ -756,123 +1229,74 @@ class StoryImageGeneratorAgent:
         fast_mode: bool = False,
         diagram_bytes: Optional[bytes] = None
     ) -> Tuple[bool, Dict]:
-        """Generate image using Replicate API."""
-        headers = {
-            "Authorization": f"Token {self.replicate_api_key}",
-            "Content-Type": "application/json"
-        }
+        """
+        Generate image using Replicate API.
+
+        Segments and their images all fan out at once, so the prediction
+        (create, poll and download) holds a slot of a shared semaphore.
+        """
+        async with self._replicate_semaphore:
+            return await self._run_replicate_prediction(
+                prompt, generation_attempt, fast_mode, diagram_bytes
+            )
+
+    async def _run_replicate_prediction(
+        self,
+        prompt: str,
+        generation_attempt: int = 0,
+        fast_mode: bool = False,
+        diagram_bytes: Optional[bytes] = None
+    ) -> Tuple[bool, Dict]:
+        """Create a Replicate prediction, poll it and download the image."""
+        headers = self._replicate_headers
         
         start_time = time.time()
         
-        # Determine model
+        # Determine model (flux falls back to SDXL from the third attempt)
         if fast_mode:
             current_model = BASE_IMAGE_MODEL_FAST
         else:
             current_model = BASE_IMAGE_MODEL_QUALITY
         
-        use_fallback = (generation_attempt >= 2 and "flux" in current_model.lower())
-        if use_fallback:
+        if generation_attempt >= 2:
             current_model = FALLBACK_IMAGE_MODEL
         
-        # Determine cost
-        model_name_lower = current_model.lower()
-        if "flux-dev" in model_name_lower or ("flux" in model_name_lower and "schnell" not in model_name_lower):
-            cost = COST_RATES["flux-dev"]
-        elif "flux-schnell" in model_name_lower or "schnell" in model_name_lower:
-            cost = COST_RATES["flux-schnell"]
-        elif "sdxl" in model_name_lower:
-            cost = COST_RATES["sdxl"]
-        else:
-            cost = COST_RATES["flux-dev"]
+        base_params, cost, accepts_image = _MODEL_PROFILES[current_model]
         
         # Add style reference if diagram available
         if diagram_bytes:
             style_ref = "Style reference: match the artistic style, color palette, and visual elements of the reference diagram. "
             prompt = style_ref + prompt
         
-        # Negative prompt
-        negative_prompt = (
-            "text, letters, words, typography, labels, captions, annotations, writing, "
-            "lettering, spelling, words on image, text overlay, watermark, signature, "
-            "inscription, script, font, typeface, characters, symbols as text, "
-            "alphanumeric, numbers as text, any readable text, any written text, "
-            "any printed text, any handwritten text, any visible text, text elements, "
-            "signs, banners, posters with text, labels on objects, text in image"
-        )
-        
         # Prepare input parameters
-        if "flux" in current_model.lower() and "schnell" in current_model.lower():
-            input_params = {
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "width": IMAGE_WIDTH,
-                "height": IMAGE_HEIGHT,
-                "output_format": "png",
-                "output_quality": 90,
-                "num_outputs": 1,
-                "num_inference_steps": 4
-            }
-            if diagram_bytes:
-                try:
-                    diagram_b64 = base64.b64encode(diagram_bytes).decode("utf-8")
-                    input_params["image"] = f"data:image/png;base64,{diagram_b64}"
-                except Exception:
-                    pass
-        elif "flux" in current_model.lower():
-            input_params = {
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "width": IMAGE_WIDTH,
-                "height": IMAGE_HEIGHT,
-                "output_format": "png",
-                "output_quality": 90,
-                "num_outputs": 1,
-                "num_inference_steps": 28
-            }
-            if diagram_bytes:
-                try:
-                    diagram_b64 = base64.b64encode(diagram_bytes).decode("utf-8")
-                    input_params["image"] = f"data:image/png;base64,{diagram_b64}"
-                except Exception:
-                    pass
-        elif "sdxl" in current_model.lower():
-            input_params = {
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "width": IMAGE_WIDTH,
-                "height": IMAGE_HEIGHT,
-                "num_outputs": 1,
-                "scheduler": "K_EULER",
-                "num_inference_steps": 20,
-                "guidance_scale": 7.5,
-                "output_format": "png"
-            }
-        else:
-            input_params = {
-                "prompt": prompt,
-                "width": IMAGE_WIDTH,
-                "height": IMAGE_HEIGHT,
-                "output_format": "png"
-            }
+        input_params = {"prompt": prompt, **base_params}
+        if diagram_bytes and accepts_image:
+            input_params["image"] = _data_url("image/png", diagram_bytes)
         
         payload = {
             "version": current_model,
             "input": input_params
         }
+        webhook_base_url = get_settings().REPLICATE_WEBHOOK_BASE_URL
+        if webhook_base_url:
+            # Completion webhook only wakes the poller; status still comes from GET
+            payload["webhook"] = replicate_webhooks.webhook_url(webhook_base_url)
+            payload["webhook_events_filter"] = ["completed"]
         
+        prediction_id = None
         try:
             # Create prediction
-            response = requests.post(
+            response = await self.http_client.post(
                 REPLICATE_API_URL,
                 headers=headers,
-                json=payload,
+                content=_json_body(payload),
                 timeout=120
             )
             
             if response.status_code not in [200, 201]:
                 error_msg = f"API returned status code: {response.status_code}"
                 try:
-                    error_data = response.json()
+                    error_data = _json_loads(response.content)
                     error_detail = error_data.get("error", "") or error_data.get("detail", "")
                     if error_detail:
                         error_msg += f" - {error_detail}"
@@ -887,7 +1311,7 @@ class StoryImageGeneratorAgent:
                     "error": True
                 })
             
-            prediction_data = response.json()
+            prediction_data = _json_loads(response.content)
             prediction_id = prediction_data.get("id")
             prediction_url = prediction_data.get("urls", {}).get("get")
             
@@ -900,22 +1324,28 @@ class StoryImageGeneratorAgent:
                     "error": True
                 })
             
-            # Poll for result
-            max_polls = 60
-            poll_interval = 5
-            
-            for poll in range(max_polls):
-                await asyncio.sleep(poll_interval)
+            # Poll for result with jittered exponential backoff: fast models
+            # are seen within a second or two, slow ones settle at ~8s polls.
+            # With webhooks enabled, the completion webhook cuts the wait short.
+            max_wait = 300
+            deadline = time.time() + max_wait
+            completed = (
+                replicate_webhooks.register(prediction_id) if webhook_base_url else None
+            )
+
+            for poll in itertools.count():
+                await self._wait_for_next_poll(completed, _backoff_delay(poll))
+                final_poll = time.time() >= deadline
                 
                 try:
-                    get_response = requests.get(
+                    get_response = await self.http_client.get(
                         prediction_url or f"{REPLICATE_API_URL}/{prediction_id}",
                         headers=headers,
                         timeout=30
                     )
-                except requests.exceptions.RequestException as e:
-                    logger.warning(f"Request error while polling (attempt {poll + 1}/{max_polls}): {e}")
-                    if poll < max_polls - 1:
+                except httpx.RequestError as e:
+                    logger.warning(f"Request error while polling (attempt {poll + 1}): {e}")
+                    if not final_poll:
                         continue
                     logger.error("Failed to get prediction status after retries")
                     return (False, {
@@ -927,8 +1357,8 @@ class StoryImageGeneratorAgent:
                     })
                 
                 if get_response.status_code != 200:
-                    logger.warning(f"Non-200 status code {get_response.status_code} while polling (attempt {poll + 1}/{max_polls})")
-                    if poll < max_polls - 1:
+                    logger.warning(f"Non-200 status code {get_response.status_code} while polling (attempt {poll + 1})")
+                    if not final_poll:
                         continue
                     logger.error("Failed to get prediction status")
                     return (False, {
@@ -940,10 +1370,10 @@ class StoryImageGeneratorAgent:
                     })
                 
                 try:
-                    prediction = get_response.json()
+                    prediction = _json_loads(get_response.content)
                 except ValueError as e:
-                    logger.warning(f"Invalid JSON response while polling (attempt {poll + 1}/{max_polls}): {e}")
-                    if poll < max_polls - 1:
+                    logger.warning(f"Invalid JSON response while polling (attempt {poll + 1}): {e}")
+                    if not final_poll:
                         continue
                     logger.error("Failed to parse prediction response")
                     return (False, {
@@ -970,7 +1400,9 @@ class StoryImageGeneratorAgent:
                     image_url = output[0] if isinstance(output, list) else output
                     
                     # Download image
-                    img_response = requests.get(image_url, timeout=30)
+                    img_response = await self.http_client.get(
+                        image_url, timeout=30, follow_redirects=True
+                    )
                     img_response.raise_for_status()
                     image_bytes = img_response.content
                     
@@ -995,8 +1427,10 @@ class StoryImageGeneratorAgent:
                     })
                 
                 elif status in ["starting", "processing"]:
-                    logger.debug(f"Prediction status: {status} (poll {poll + 1}/{max_polls})")
-                    continue
+                    logger.debug(f"Prediction status: {status} (poll {poll + 1})")
+                    if not final_poll:
+                        continue
+                    break
                 elif status == "canceled":
                     logger.error("Prediction was canceled")
                     return (False, {
@@ -1018,7 +1452,7 @@ class StoryImageGeneratorAgent:
                     })
             
             # Timeout
-            logger.error(f"Prediction timed out after {max_polls * poll_interval}s")
+            logger.error(f"Prediction timed out after {max_wait}s")
             return (False, {
                 "model_used": current_model,
                 "cost": 0.0,
@@ -1034,111 +1468,135 @@ class StoryImageGeneratorAgent:
                 "time_seconds": time.time() - start_time,
                 "error": True
             })
+        finally:
+            if prediction_id and webhook_base_url:
+                replicate_webhooks.unregister(prediction_id)
+    
+    @staticmethod
+    async def _wait_for_next_poll(completed: Optional[asyncio.Event], delay: float):
+        """Sleep until the next poll, or until the completion webhook arrives."""
+        if completed is None:
+            await asyncio.sleep(delay)
+            return
+        try:
+            await asyncio.wait_for(completed.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        # Re-arm so a status that is not final yet falls back to the backoff
+        completed.clear()
     
     async def _verify_image_no_labels(
         self,
         image_bytes: bytes,
         max_passes: int = 5
+    ) -> Tuple[bool, Dict, str, Dict]:
+        """
+        Verify image has no text, labels, or words, reusing the verdict for
+        byte-identical images instead of calling the vision model again.
+
+        A duplicate that arrives while the first check is still running
+        waits for that check rather than starting its own. The shared check
+        is cancelled once every caller waiting on it has gone (e.g. the run
+        was cancelled), so it never keeps calling the API on its own.
+        """
+        key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        cached = _verification_cache.get(key)
+        if cached is not None:
+            _verification_cache.move_to_end(key)
+            passed, result, error = cached
+            return self._reused_verdict(passed, result, error)
+
+        task = self._verifications_in_flight.get(key)
+        first = task is None
+        if first:
+            task = asyncio.ensure_future(
+                self._verify_and_cache(key, image_bytes, max_passes)
+            )
+            self._verifications_in_flight[key] = task
+            self._verification_waiters[key] = 0
+            task.add_done_callback(lambda done: self._forget_verification(key, done))
+
+        self._verification_waiters[key] += 1
+        try:
+            # shield: one caller leaving must not cancel the check others share
+            passed, result, error, metadata = await asyncio.shield(task)
+        finally:
+            if self._verifications_in_flight.get(key) is task:
+                self._verification_waiters[key] -= 1
+                if not self._verification_waiters[key] and not task.done():
+                    task.cancel()
+                    self._forget_verification(key, task)
+
+        if first:
+            return passed, result, error, metadata
+        return self._reused_verdict(passed, result, error)
+
+    def _forget_verification(self, key: bytes, task: asyncio.Task) -> None:
+        """Drop a finished or abandoned shared check (if it is still the current one)."""
+        if self._verifications_in_flight.get(key) is task:
+            del self._verifications_in_flight[key]
+            del self._verification_waiters[key]
+
+    async def _verify_and_cache(
+        self,
+        key: bytes,
+        image_bytes: bytes,
+        max_passes: int
+    ) -> Tuple[bool, Dict, str, Dict]:
+        """Run the vision check and cache its verdict under the content hash."""
+        passed, result, error, metadata = await self._verify_image_uncached(
+            image_bytes, max_passes
+        )
+
+        # Only cache actual verdicts; API errors and unparseable replies
+        # return an empty result and should be retried next time
+        if result:
+            _verification_cache[key] = (passed, dict(result), error)
+            _verification_cache.move_to_end(key)
+            while len(_verification_cache) > VERIFICATION_CACHE_MAX_ENTRIES:
+                _verification_cache.popitem(last=False)
+
+        return passed, result, error, metadata
+
+    @staticmethod
+    def _reused_verdict(passed: bool, result: Dict, error: str) -> Tuple[bool, Dict, str, Dict]:
+        """Verification tuple for a verdict that cost no model call."""
+        return (passed, dict(result), error, {
+            "cost": 0.0,
+            "time_seconds": 0.0,
+            "attempts_made": 0,
+            "confidence": result.get("confidence", 0.0),
+            "cached": True
+        })
+
+    async def _verify_image_uncached(
+        self,
+        image_bytes: bytes,
+        max_passes: int = 5
     ) -> Tuple[bool, Dict, str, Dict]:
         """Verify image has no text, labels, or words using OpenRouter vision model."""
-        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+        # Decode/resize/encode is CPU-bound; keep it off the event loop
+        image_data_url = await asyncio.to_thread(_encode_for_verification, image_bytes)
         
         start_time = time.time()
         attempts_made = 0
         total_cost = 0.0
         
-        verification_prompt = """Analyze this image and respond with JSON only.
-
-Check:
-1. Does the image contain ANY text, labels, words, lettering, or readable characters? (has_text: true/false)
-2. Are there any watermarks, signatures, or annotations? (has_annotations: true/false)
-3. How confident are you? (confidence: 0.0-1.0)
-
-Respond ONLY with valid JSON in this exact format:
-{
-  "has_text": false,
-  "has_annotations": false,
-  "confidence": 0.95
-}"""
-        
         for attempt in range(max_passes):
             attempts_made += 1
             try:
-                response = requests.post(
-                    OPENROUTER_API_URL,
-                    headers={
-                        "Authorization": f"Bearer {self.openrouter_api_key}",
-                        "HTTP-Referer": "https://github.com/your-repo",
-                        "X-Title": "Story Image Generator",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": VERIFICATION_MODEL,
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "text",
-                                        "text": verification_prompt
-                                    },
-                                    {
-                                        "type": "image_url",
-                                        "image_url": {
-                                            "url": f"data:image/png;base64,{image_b64}"
-                                        }
-                                    }
-                                ]
-                            }
-                        ],
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=60
+                # Concurrent verifications share one vision call
+                status_code, result, error_text, batch_size = (
+                    await self._verification_batcher.verify(image_data_url)
                 )
+                # A batched call is billed once; each image pays its share
+                verification_cost = COST_RATES["gpt-4o-mini-verification"] / batch_size
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    
-                    try:
-                        result = json.loads(content)
-                        has_text = result.get("has_text", True)
-                        has_annotations = result.get("has_annotations", True)
-                        confidence = result.get("confidence", 0.0)
-                        
-                        verification_cost = COST_RATES["gpt-4o-mini-verification"]
-                        total_cost += verification_cost
-                        
-                        success = not has_text and not has_annotations
-                        
-                        if success:
-                            elapsed_time = time.time() - start_time
-                            return (True, result, "", {
-                                "cost": total_cost,
-                                "time_seconds": elapsed_time,
-                                "attempts_made": attempts_made,
-                                "confidence": confidence
-                            })
-                        else:
-                            error_msg = (
-                                f"Text/annotations detected: has_text={has_text}, "
-                                f"has_annotations={has_annotations}, confidence={confidence:.2f}"
-                            )
-                            if attempt < max_passes - 1:
-                                await asyncio.sleep(2)
-                                continue
-                            
-                            elapsed_time = time.time() - start_time
-                            return (False, result, error_msg, {
-                                "cost": total_cost,
-                                "time_seconds": elapsed_time,
-                                "attempts_made": attempts_made,
-                                "confidence": confidence
-                            })
+                if status_code == 200:
+                    total_cost += verification_cost
                     
-                    except json.JSONDecodeError:
-                        verification_cost = COST_RATES["gpt-4o-mini-verification"]
-                        total_cost += verification_cost
+                    if result is None:
+                        # Unparseable (or missing) verdict for this image
                         if attempt < max_passes - 1:
                             await asyncio.sleep(2)
                             continue
@@ -1148,9 +1606,39 @@ Respond ONLY with valid JSON in this exact format:
                             "time_seconds": elapsed_time,
                             "attempts_made": attempts_made
                         })
+                    
+                    has_text = result.get("has_text", True)
+                    has_annotations = result.get("has_annotations", True)
+                    confidence = result.get("confidence", 0.0)
+                    
+                    success = not has_text and not has_annotations
+                    
+                    if success:
+                        elapsed_time = time.time() - start_time
+                        return (True, result, "", {
+                            "cost": total_cost,
+                            "time_seconds": elapsed_time,
+                            "attempts_made": attempts_made,
+                            "confidence": confidence
+                        })
+                    else:
+                        error_msg = (
+                            f"Text/annotations detected: has_text={has_text}, "
+                            f"has_annotations={has_annotations}, confidence={confidence:.2f}"
+                        )
+                        if attempt < max_passes - 1:
+                            await asyncio.sleep(2)
+                            continue
+                        
+                        elapsed_time = time.time() - start_time
+                        return (False, result, error_msg, {
+                            "cost": total_cost,
+                            "time_seconds": elapsed_time,
+                            "attempts_made": attempts_made,
+                            "confidence": confidence
+                        })
                 else:
-                    if response.status_code == 429:
-                        verification_cost = COST_RATES["gpt-4o-mini-verification"]
+                    if status_code == 429:
                         total_cost += verification_cost
                         base_wait = 5
                         wait_time = min(base_wait * (2 ** attempt), 60)
@@ -1166,14 +1654,12 @@ Respond ONLY with valid JSON in this exact format:
                             "attempts_made": attempts_made
                         })
                     
-                    verification_cost = COST_RATES["gpt-4o-mini-verification"]
                     total_cost += verification_cost
-                    error_text = response.text
                     if attempt < max_passes - 1:
                         await asyncio.sleep(2)
                         continue
                     elapsed_time = time.time() - start_time
-                    return (False, {}, f"API error {response.status_code}: {error_text[:200]}", {
+                    return (False, {}, f"API error {status_code}: {error_text[:200]}", {
                         "cost": total_cost,
                         "time_seconds": elapsed_time,
                         "attempts_made": attempts_made
@@ -1199,3 +1685,70 @@ Respond ONLY with valid JSON in this exact format:
             "attempts_made": attempts_made
         })
 
+    async def _post_verification(
+        self,
+        images: List[str]
+    ) -> List[Tuple[int, Optional[Dict], str, int]]:
+        """
+        Send one OpenRouter vision request for one or more images.
+
+        Args:
+            images: base64 data URL per image
+
+        Returns:
+            (HTTP status, verdict dict or None if unparseable, error text,
+            number of images in the call) per image, in input order
+        """
+        if len(images) == 1:
+            content = [_VERIFICATION_PROMPT_PART]
+        else:
+            content = [_BATCH_VERIFICATION_PROMPT_PART]
+        for index, data_url in enumerate(images, 1):
+            if len(images) > 1:
+                content.append({"type": "text", "text": f"Image {index}:"})
+            content.append({
+                "type": "image_url",
+                "image_url": {"url": data_url}
+            })
+
+        response = await self.http_client.post(
+            OPENROUTER_API_URL,
+            headers={
+                "Authorization": f"Bearer {self.openrouter_api_key}",
+                "HTTP-Referer": "https://github.com/your-repo",
+                "X-Title": "Story Image Generator",
+                "Content-Type": "application/json"
+            },
+            content=_json_body({
+                "model": VERIFICATION_MODEL,
+                "messages": [{"role": "user", "content": content}],
+                "response_format": {"type": "json_object"}
+            }),
+            timeout=60
+        )
+
+        if response.status_code != 200:
+            return [(response.status_code, None, response.text, len(images))] * len(images)
+
+        data = _json_loads(response.content)
+        message = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+        try:
+            parsed = _json_loads(message)
+        except (ValueError, TypeError):
+            return [(200, None, "", len(images))] * len(images)
+
+        if len(images) == 1:
+            verdicts = [parsed]
+        else:
+            # {"results": [{"index": 1, ...}, ...]}, matched back by index
+            by_index = {}
+            entries = parsed.get("results") if isinstance(parsed, dict) else None
+            for entry in entries or []:
+                if isinstance(entry, dict) and isinstance(entry.get("index"), int):
+                    by_index[entry["index"]] = {k: v for k, v in entry.items() if k != "index"}
+            verdicts = [by_index.get(index) for index in range(1, len(images) + 1)]
+
+        return [
+            (200, verdict if isinstance(verdict, dict) else None, "", len(images))
+            for verdict in verdicts
+        ]
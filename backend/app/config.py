@@ -81,6 +81,36 @@ class Settings(BaseSettings):
     # Video Processing API URL (used by frontend)
     VIDEO_PROCESSING_API_URL: Optional[str] = "http://localhost:8000"
 
+    # Max image generations (DALL-E calls / template pulls) in flight per agent
+    IMG_MAX_CONCURRENCY: int = 5
+
+    # Encoding for customized template images: "PNG" (fast zlib level) or "WEBP"
+    TEMPLATE_IMAGE_FORMAT: str = "PNG"
+
+    # Use the condensed prompt-parser system prompt (fewer input tokens)
+    PROMPT_PARSER_COMPACT_PROMPT: bool = False
+
+    # Default for the prompt parser's options["cache_mode"]: reuse cached
+    # temperature-0 parses for repeated prompts instead of sampling each time
+    PROMPT_PARSER_CACHE_MODE: bool = False
+
+    # Default for the narrative builder's data["cache_mode"]: reuse a recent
+    # script for an identical request instead of generating a new one
+    NARRATIVE_BUILDER_CACHE_MODE: bool = False
+
+    # Default for the story image agent's use_image_cache: reuse verified
+    # images from earlier identical requests (shared across sessions)
+    STORY_IMAGE_CACHE: bool = False
+
+    # Extra Replicate API keys (comma-separated) the prompt parser spreads
+    # load across and fails over to when the primary key errors or times out
+    REPLICATE_EXTRA_API_KEYS: str = ""
+
+    # Public base URL of this API (e.g. https://api.example.com). When set,
+    # story image predictions ask Replicate for a completion webhook that
+    # wakes the poller early; polling still runs as the fallback.
+    REPLICATE_WEBHOOK_BASE_URL: Optional[str] = None
+
     class Config:
         env_file = ".env"
         case_sensitive = True
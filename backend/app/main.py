@@ -18,6 +18,8 @@ from sqlalchemy import text as sql_text
 from app.config import get_settings
 from app.services.storage import StorageService
 from app.services.websocket_manager import WebSocketManager
+from app.services import replicate_webhooks
+from app.agents.batch_image_generator import shutdown_render_pool
 from app.database import get_db
 
 logger = logging.getLogger(__name__)
@@ -191,6 +193,14 @@ async def startup_event():
         print(f"ERROR in startup event: {e}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared generation orchestrator and stop the template render pool."""
+    from app.routes import generation
+    await generation.orchestrator.aclose()
+    shutdown_render_pool()
+
+
 @app.get("/health")
 @app.get("/api/health")
 def health_check():
@@ -344,6 +354,26 @@ async def root():
     return {"status": "healthy", "service": "Gauntlet Pipeline Orchestrator"}
 
 
+@app.post(replicate_webhooks.WEBHOOK_PATH)
+async def replicate_webhook(request: Request):
+    """
+    Replicate prediction completion webhook.
+
+    Only wakes the story image poller waiting on the prediction; the poller
+    re-fetches the status from the Replicate API itself.
+    """
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    prediction_id = payload.get("id") if isinstance(payload, dict) else None
+    if not isinstance(prediction_id, str) or not prediction_id:
+        raise HTTPException(status_code=400, detail="Missing prediction id")
+
+    return {"received": True, "waiting": replicate_webhooks.notify(prediction_id)}
+
+
 @app.get("/scaffoldtest", response_class=HTMLResponse)
 @app.get("/scaffoldtest_ui.html", response_class=HTMLResponse)
 async def scaffoldtest_ui():
@@ -794,6 +824,7 @@ async def start_processing(
                 logger.exception(f"Error in orchestrator for session {session_id}: {e}")
                 # Error status will be sent by orchestrator
             finally:
+                await orchestrator.aclose()
                 # Clean up process tracking on completion
                 if user_id in app.state.active_user_processes:
                     del app.state.active_user_processes[user_id]
@@ -1388,6 +1419,7 @@ async def restart_agent5_concat(request: RestartAgent5Request, db: Session = Dep
     
     # Start Agent5 with restart flag
     async def run_agent_5_restart():
+        orchestrator = None
         try:
             from app.agents.agent_5 import agent_5_process
             from app.services.orchestrator import VideoGenerationOrchestrator
@@ -1445,6 +1477,9 @@ async def restart_agent5_concat(request: RestartAgent5Request, db: Session = Dep
                 })
             except Exception:
                 pass
+        finally:
+            if orchestrator is not None:
+                await orchestrator.aclose()
     
     # Run in background
     loop = asyncio.get_event_loop()
@@ -3,7 +3,7 @@ Database models for Gauntlet Pipeline.
 
 Models based on DATABASE_SCHEMA.md specification.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, JSON, ARRAY
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, JSON, ARRAY, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -186,6 +186,10 @@ class MusicTrack(Base):
     """Music track library for background audio."""
 
     __tablename__ = "music_tracks"
+    __table_args__ = (
+        # Covers the category + minimum duration filter in MusicSelectionAgent
+        Index("ix_music_tracks_category_duration", "category", "duration"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     track_id = Column(String(255), unique=True, nullable=False, index=True)
@@ -0,0 +1,49 @@
+"""
+Shared HTTP clients for external API calls.
+
+TTS and DALL-E requests all go to api.openai.com. One process-wide
+httpx client with HTTP/2 lets concurrent requests multiplex over a single
+TLS connection, and keepalive lets later sessions reuse it instead of
+re-handshaking.
+
+Replicate and OpenRouter calls made directly over HTTP share a second,
+larger pool so parallel segment work reuses connections too.
+"""
+import httpx
+from typing import Optional
+
+_openai_http_client: Optional[httpx.AsyncClient] = None
+_api_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_openai_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide httpx client for OpenAI clients.
+
+    Pass it as ``AsyncOpenAI(http_client=...)``. It is shared, so callers
+    must not close it; a new one is created if it was closed anyway.
+    """
+    global _openai_http_client
+    if _openai_http_client is None or _openai_http_client.is_closed:
+        _openai_http_client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(http2=True, retries=2),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            timeout=60.0
+        )
+    return _openai_http_client
+
+
+def get_api_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide httpx client for Replicate/OpenRouter requests.
+
+    Callers pass per-request timeouts as needed. It is shared, so callers
+    must not close it; a new one is created if it was closed anyway.
+    """
+    global _api_http_client
+    if _api_http_client is None or _api_http_client.is_closed:
+        _api_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=60.0
+        )
+    return _api_http_client
@@ -0,0 +1,130 @@
+"""
+Helpers for consuming streamed LLM output.
+
+Replicate streams language-model output as server-sent events. Agents that
+ask for a single JSON object can stop reading once that object closes and
+cancel the prediction, which skips any trailing tokens (explanations,
+sign-offs) the model would otherwise generate and bill.
+"""
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict
+
+import httpx
+import replicate
+
+from app.services.http_client import get_api_http_client
+
+logger = logging.getLogger(__name__)
+
+STREAM_HEADERS = {"Accept": "text/event-stream", "Cache-Control": "no-store"}
+
+
+class JSONObjectScanner:
+    """
+    Tracks brace depth across streamed text to spot where the first
+    top-level JSON object closes. Braces inside string literals are ignored.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk; return True once the top-level object has closed."""
+        for ch in chunk:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                if self.started:
+                    self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+                self.started = True
+            elif ch == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
+async def _iter_output_events(response: httpx.Response) -> AsyncIterator[str]:
+    """Yield the data of "output" server-sent events until "done"."""
+    event, data = None, []
+    async for line in response.aiter_lines():
+        if line:
+            field, _, value = line.partition(":")
+            if field == "event":
+                event = value.removeprefix(" ")
+            elif field == "data":
+                data.append(value.removeprefix(" "))
+            continue
+        # Blank line: dispatch the event collected so far
+        if event == "output":
+            yield "\n".join(data)
+        elif event == "error":
+            raise RuntimeError("\n".join(data))
+        elif event == "done":
+            return
+        event, data = None, []
+
+
+async def stream_json_prediction(
+    client: replicate.Client,
+    api_token: str,
+    model: str,
+    input: Dict[str, Any]
+) -> str:
+    """
+    Run an official (unversioned) Replicate language model with streaming
+    and return its output up to the close of the first top-level JSON object.
+
+    Once the object closes (or if the caller gives up early) the prediction
+    is cancelled, so the model stops generating tokens nobody will read. If
+    no object closes, the whole output is returned.
+    """
+    prediction = await client.models.predictions.async_create(
+        model=model, input=input, stream=True
+    )
+    stream_url = (prediction.urls or {}).get("stream")
+    if not stream_url:
+        await _cancel_prediction(client, prediction.id)
+        raise RuntimeError(f"Model {model} does not support streaming")
+
+    chunks = []
+    scanner = JSONObjectScanner()
+    finished = False
+    try:
+        async with get_api_http_client().stream(
+            "GET",
+            stream_url,
+            headers={"Authorization": f"Token {api_token}", **STREAM_HEADERS},
+            timeout=60.0
+        ) as response:
+            response.raise_for_status()
+            async with aclosing(_iter_output_events(response)) as events:
+                async for chunk in events:
+                    chunks.append(chunk)
+                    if scanner.feed(chunk):
+                        break
+                else:
+                    finished = True
+    finally:
+        if not finished:
+            await _cancel_prediction(client, prediction.id)
+    return "".join(chunks)
+
+
+async def _cancel_prediction(client: replicate.Client, prediction_id: str) -> None:
+    """Best-effort cancel; the response is already in hand either way."""
+    try:
+        await client.predictions.async_cancel(prediction_id)
+    except Exception as e:
+        logger.debug("Could not cancel prediction %s: %s", prediction_id, e)
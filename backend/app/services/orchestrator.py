@@ -18,6 +18,7 @@ from app.agents.narrative_builder import NarrativeBuilderAgent
 from app.agents.audio_pipeline import AudioPipelineAgent
 from app.services.ffmpeg_compositor import FFmpegCompositor
 from app.services.storage import StorageService
+from app.services.progress_items import CumulativeItems
 from app.config import get_settings
 from typing import Dict, Any, Optional, List
 import uuid
@@ -204,7 +205,14 @@ class VideoGenerationOrchestrator:
                 "Add it to AWS Secrets Manager (pipeline/replicate-api-key) or .env file."
             )
 
-        self.prompt_parser = PromptParserAgent(replicate_api_key) if replicate_api_key else None
+        # Extra Replicate keys become failover endpoints for the prompt parser
+        extra_replicate_keys = [
+            key.strip() for key in settings.REPLICATE_EXTRA_API_KEYS.split(",") if key.strip()
+        ]
+        self.prompt_parser = PromptParserAgent(
+            replicate_api_key,
+            endpoints=[{"token": key} for key in extra_replicate_keys]
+        ) if replicate_api_key else None
         self.image_generator = BatchImageGeneratorAgent(openai_api_key) if openai_api_key else None
         self.narrative_builder = NarrativeBuilderAgent(replicate_api_key) if replicate_api_key else None
         self.audio_pipeline = AudioPipelineAgent(openai_api_key) if openai_api_key else None
@@ -231,6 +239,17 @@ class VideoGenerationOrchestrator:
         self.cancellation_event.set()
         logger.info("Orchestrator cancellation requested")
 
+    async def aclose(self):
+        """Release agent resources (the image generator's HTTP clients)."""
+        if self.image_generator:
+            await self.image_generator.aclose()
+
+    async def __aenter__(self) -> "VideoGenerationOrchestrator":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
     async def generate_images(
         self,
         db: Session,
@@ -2167,20 +2186,21 @@ class VideoGenerationOrchestrator:
         # Prepare image generation input (from segments.md)
         output_s3_prefix = self.storage_service.get_session_prefix(user_id, session_id, "images")
         
-        # Read and parse segments.md
-        segments_content = self.storage_service.read_file(s3_path)
+        # Read and parse segments.md (blocking S3 calls run in worker threads)
+        segments_content = await asyncio.to_thread(self.storage_service.read_file, s3_path)
         segments_text = segments_content.decode("utf-8")
         parsed_template_title, segments = parse_segments_md(segments_text)
         
         # Check if diagram exists
         diagram_s3_path = None
         diagram_s3_key = self.storage_service.get_session_path(user_id, session_id, "images", "diagram.png")
-        if self.storage_service.file_exists(diagram_s3_key):
+        if await asyncio.to_thread(self.storage_service.file_exists, diagram_s3_key):
             diagram_s3_path = diagram_s3_key
 
         # Initialize cumulative status items for all images and audio BEFORE creating AgentInputs
         num_images_per_segment = image_options.get("num_images", 2)
-        cumulative_items = []
+        # Shared by both agents; tracks status counts as items change
+        cumulative_items = CumulativeItems()
 
         # Add image items for each segment
         for seg in segments:
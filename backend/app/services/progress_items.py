@@ -0,0 +1,68 @@
+"""
+Cumulative progress items shared by parallel generation agents.
+
+The image and audio agents update one list of status items and each
+broadcasts the whole list. Keeping an id index and the status counts next
+to the list makes each update and progress read O(1) instead of a rescan.
+"""
+from typing import Any, Dict, Iterable
+
+
+class CumulativeItems(list):
+    """
+    List of status item dicts with O(1) status bookkeeping.
+
+    Items look like {"id", "name", "status", "type"} with status one of
+    pending, processing or completed. It is still a plain list, so it
+    serializes unchanged in broadcast_status. Add items with append() and
+    change statuses through set_status() so the counters stay in sync.
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]] = ()):
+        super().__init__()
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._position: Dict[str, int] = {}
+        self._processing: Dict[str, int] = {}  # id -> list position
+        self.completed_count = 0
+        for item in items:
+            self.append(item)
+
+    def append(self, item: Dict[str, Any]) -> None:
+        """Add an item and index it."""
+        self._position[item["id"]] = len(self)
+        self._by_id[item["id"]] = item
+        super().append(item)
+        self._track(item["id"], item["status"], 1)
+
+    def set_status(self, item_id: str, status: str) -> bool:
+        """Set an item's status; False if no item has this id."""
+        item = self._by_id.get(item_id)
+        if item is None:
+            return False
+        self._track(item_id, item["status"], -1)
+        item["status"] = status
+        self._track(item_id, status, 1)
+        return True
+
+    def _track(self, item_id: str, status: str, delta: int) -> None:
+        """Add (delta=1) or remove (delta=-1) an item's status from the counters."""
+        if status == "completed":
+            self.completed_count += delta
+        elif status == "processing":
+            if delta > 0:
+                self._processing[item_id] = self._position[item_id]
+            else:
+                self._processing.pop(item_id, None)
+
+    @property
+    def progress(self) -> int:
+        """Completed percentage (0-100)."""
+        return int((self.completed_count / len(self)) * 100) if self else 0
+
+    @property
+    def details(self) -> str:
+        """Status line naming the first processing item, else the completed count."""
+        if self._processing:
+            first = min(self._processing.values())
+            return f"Processing: {self[first]['name']}"
+        return f"Completed {self.completed_count} of {len(self)} items"
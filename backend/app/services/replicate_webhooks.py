@@ -0,0 +1,43 @@
+"""
+In-process wake-ups for Replicate prediction webhooks.
+
+Pollers register the prediction they are waiting on and sleep on its
+event between polls; the webhook route sets the event when Replicate
+reports completion. The webhook is only a wake-up signal: the poller still
+fetches the prediction from the API, so a webhook that lands on another
+worker (or a forged one) costs at most one early poll.
+"""
+import asyncio
+from typing import Dict
+
+WEBHOOK_PATH = "/api/webhooks/replicate"
+
+# prediction id -> event set when its completion webhook arrives
+_waiters: Dict[str, asyncio.Event] = {}
+
+
+def webhook_url(base_url: str) -> str:
+    """Full webhook URL for the public API base URL."""
+    return base_url.rstrip("/") + WEBHOOK_PATH
+
+
+def register(prediction_id: str) -> asyncio.Event:
+    """Return the wake-up event for a prediction, creating it if needed."""
+    event = _waiters.get(prediction_id)
+    if event is None:
+        event = _waiters[prediction_id] = asyncio.Event()
+    return event
+
+
+def unregister(prediction_id: str) -> None:
+    """Stop listening for a prediction's webhook."""
+    _waiters.pop(prediction_id, None)
+
+
+def notify(prediction_id: str) -> bool:
+    """Wake the poller waiting on a prediction; False if none is waiting here."""
+    event = _waiters.get(prediction_id)
+    if event is None:
+        return False
+    event.set()
+    return True
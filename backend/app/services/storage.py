@@ -7,18 +7,31 @@ for serving generated images and videos.
 """
 
 import os
+import io
+import asyncio
 import boto3
 import httpx
 import logging
 import uuid
 import json
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, BinaryIO
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Larger connection pool so concurrent uploads run via asyncio.to_thread
+# don't queue behind botocore's default of 10 connections
+S3_CLIENT_CONFIG = Config(max_pool_connections=32)
+
+# Streamed downloads are read in these chunks and uploaded with
+# upload_fileobj (multipart above the threshold, e.g. for videos)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+S3_TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024)
+
 
 class StorageService:
     """
@@ -44,14 +57,16 @@ class StorageService:
                     's3',
                     aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
                     aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                    region_name=settings.AWS_REGION
+                    region_name=settings.AWS_REGION,
+                    config=S3_CLIENT_CONFIG
                 )
                 logger.info(f"Storage service initialized with explicit credentials, bucket: {self.bucket_name}")
             else:
                 # Use instance profile (boto3 will automatically use EC2 instance profile)
                 self.s3_client = boto3.client(
                     's3',
-                    region_name=settings.AWS_REGION
+                    region_name=settings.AWS_REGION,
+                    config=S3_CLIENT_CONFIG
                 )
                 logger.info(f"Storage service initialized with instance profile, bucket: {self.bucket_name}")
         except Exception as e:
@@ -163,6 +178,32 @@ class StorageService:
             logger.error(f"Direct upload failed: {e}")
             raise Exception(f"Upload failed: {e}")
 
+    async def put_bytes_async(
+        self,
+        s3_key: str,
+        data: bytes,
+        content_type: str = 'application/octet-stream'
+    ) -> str:
+        """
+        Upload bytes to S3 without blocking the event loop.
+
+        Runs upload_file_direct in a worker thread so other in-flight
+        requests keep progressing during the upload.
+
+        Args:
+            s3_key: S3 object key
+            data: File bytes to upload
+            content_type: MIME type of the file
+
+        Returns:
+            S3 URL of uploaded file
+
+        Raises:
+            ValueError: If storage service not configured
+            Exception: If upload fails
+        """
+        return await asyncio.to_thread(self.upload_file_direct, data, s3_key, content_type)
+
     def delete_file(self, s3_key: str) -> bool:
         """
         Delete a file from S3.
@@ -322,12 +363,17 @@ class StorageService:
             # Download file from Replicate
             logger.info(f"Downloading {asset_type} from Replicate: {replicate_url}")
 
+            # Stream into one buffer chunk by chunk rather than holding the
+            # response body and then copying it for the upload
+            buffer = io.BytesIO()
             async with httpx.AsyncClient(timeout=300.0) as client:  # 5 min timeout for videos
-                response = await client.get(replicate_url)
-                response.raise_for_status()
-                file_content = response.content
+                async with client.stream("GET", replicate_url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        buffer.write(chunk)
 
-            file_size = len(file_content)
+            file_size = buffer.tell()
+            buffer.seek(0)
             logger.info(f"Downloaded {file_size} bytes")
 
             # Determine file extension and content type
@@ -362,11 +408,12 @@ class StorageService:
             # Upload to S3
             logger.info(f"Uploading to S3: {s3_key}")
 
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=content_type
+            self.s3_client.upload_fileobj(
+                buffer,
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={"ContentType": content_type},
+                Config=S3_TRANSFER_CONFIG
                 # Note: Bucket policy makes objects publicly readable, ACLs are disabled
             )
 
@@ -781,6 +828,42 @@ class StorageService:
             logger.error(f"Failed to read file from S3: {e}")
             raise Exception(f"Failed to read file from S3: {e}")
 
+    def download_fileobj(self, s3_key: str, fileobj: BinaryIO) -> None:
+        """
+        Stream a file from S3 into a writable binary file object.
+
+        Unlike read_file, the object is never held in memory as a whole;
+        large objects are fetched as concurrent ranged GETs.
+
+        Args:
+            s3_key: S3 object key
+            fileobj: Writable binary file object (e.g. open(path, 'wb'))
+
+        Raises:
+            ValueError: If storage service not configured
+            FileNotFoundError: If the object does not exist
+            Exception: If the download fails
+        """
+        if not self.s3_client:
+            raise ValueError("Storage service not configured")
+
+        try:
+            self.s3_client.download_fileobj(
+                self.bucket_name,
+                s3_key,
+                fileobj,
+                Config=S3_TRANSFER_CONFIG
+            )
+            logger.debug(f"Downloaded from S3: {s3_key}")
+
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+            if error_code in ('NoSuchKey', '404'):
+                logger.error(f"File not found in S3: {s3_key}")
+                raise FileNotFoundError(f"File not found in S3: {s3_key}")
+            logger.error(f"Failed to download file from S3: {e}")
+            raise Exception(f"Failed to download file from S3: {e}")
+
     def file_exists(self, s3_key: str) -> bool:
         """
         Check if a file exists in S3.